@@ -2,7 +2,9 @@
 """A blatant clone of Battleship."""
 
 import os
-from random import randint, choice as rand_choice
+import random
+
+import gameclock
 
 __author__ = 'Dan Mudie'
 
@@ -119,6 +121,10 @@ class Gameboard(object):
         self.ships = []
         self.misses = [] #A list of  missed shots as Coord objects
         self.defeated = False #Indicates if the player has lost
+        #Called as listener(pos, result, ship) after every shot that lands
+        #on the board.  result is HIT, SUNK or MISS, ship is the Ship that
+        #was hit (None for a MISS).  See shotlog.py.
+        self.listeners = []
 
     def print(self):
         """Print the gameboard."""
@@ -277,11 +283,15 @@ class Gameboard(object):
                             game_over = False
                             break
                     if game_over: self.defeated = True
+                for listener in self.listeners:
+                    listener(pos, SUNK if ship.sunk else HIT, ship)
                 return True
 
         #if we got here, the shot must be a miss
         if verbose: print("Miss!")
         self.misses.append(pos)
+        for listener in self.listeners:
+            listener(pos, MISS, None)
         return False
 
 class AI(object):
@@ -290,10 +300,22 @@ class AI(object):
     It's like the little robot kid from that Steven Spielberg movie who
     could see dead people.
 
-    Takes no args to initialize and doesn't actually have any attributes.
     Just plays the game with the gameboards it is passed each turn.
 
+    Args:
+        rng (random.Random, optional): Where the AI gets its random numbers.
+            Anything with the randint() method of random.Random will do.
+            Defaults to the random module, i.e. the global generator.
+            Give each AI its own seeded generator to replay a game exactly
+            or to run games in parallel, see rngstreams.py.
+
     """
+    #recorded with every shot the AI fires, see shotlog.py
+    strategy = 'hunt-target'
+
+    def __init__(self, rng=None):
+        self.rng = rng if rng is not None else random
+
     def place_ships(self, gameboard):
         """Place ships on the gameboard.
 
@@ -304,14 +326,17 @@ class AI(object):
         """
 
         orientations = ['h','v']
-        for ship in set(SHIP_LENGTHS.keys()) - set([s.type for s in gameboard.ships]):
+        randint = self.rng.randint
+        placed = [s.type for s in gameboard.ships]
+        #go through the ships in a fixed order (not set order, which
+        #changes from run to run) so a seeded game always plays the same
+        for ship in [s for s in SHIP_LENGTHS.keys() if s not in placed]:
             ship_placed = False
             while not ship_placed:
                 pos = Coord(randint(0,9), randint(0,9))
                 o = orientations[randint(0,1)]
-                if gameboard.add_ship(pos=pos, type = ship, orientation=o, verbose=False) == False:
-                    clear_screen()
-                else: ship_placed = True
+                if gameboard.add_ship(pos=pos, type = ship, orientation=o, verbose=False) != False:
+                    ship_placed = True
         return
 
     def can_I_shoot_here(self, pos, enemy_gameboard):
@@ -366,9 +391,9 @@ class AI(object):
                     #Holey moley, it's recursion!
                     return self.find_next_unhit_ship_point(next_pt, direction, \
                     gameboard)
-                #If the point is a MISS, there are no more ship points
-                #here
-                if hits_and_misses[next_pt] == MISS:
+                #If the point is a MISS or part of a SUNK ship, there are
+                #no more ship points here
+                if hits_and_misses[next_pt] in (MISS, SUNK):
                     return None
             return next_pt
 
@@ -379,7 +404,7 @@ class AI(object):
                 if hits_and_misses[next_pt] == HIT:
                     return self.find_next_unhit_ship_point(next_pt, direction,\
                      gameboard)
-                if hits_and_misses[next_pt] == MISS:
+                if hits_and_misses[next_pt] in (MISS, SUNK):
                     return None
             return next_pt
 
@@ -390,7 +415,7 @@ class AI(object):
                 if hits_and_misses[next_pt] == HIT:
                     return self.find_next_unhit_ship_point(next_pt, direction,\
                     gameboard)
-                if hits_and_misses[next_pt] == MISS:
+                if hits_and_misses[next_pt] in (MISS, SUNK):
                     return None
             return next_pt
 
@@ -401,7 +426,7 @@ class AI(object):
                 if hits_and_misses[next_pt] == HIT:
                     return self.find_next_unhit_ship_point(next_pt, direction, \
                     gameboard)
-                if hits_and_misses[next_pt] == MISS:
+                if hits_and_misses[next_pt] in (MISS, SUNK):
                     return None
             return next_pt
 
@@ -531,7 +556,8 @@ class AI(object):
 
         #shoot randomly
         while True:
-            target = Coord(randint(0,GAME_WIDTH-1), randint(0,GAME_HEIGHT-1))
+            target = Coord(self.rng.randint(0,GAME_WIDTH-1),
+                           self.rng.randint(0,GAME_HEIGHT-1))
             if target in hits_and_misses.keys():
                 continue
             else:
@@ -551,7 +577,7 @@ def get_an_int(prompt, min, max):
     """
     while True:
         try:
-            value = int(input(prompt))
+            value = int(gameclock.ask(prompt))
         except ValueError:
             print(f"Please enter a number between {min} and {max}")
             continue
@@ -574,7 +600,7 @@ def get_an_uppercase_string(prompt, possible_choices):
     """
     while True:
         try:
-            value = str(input(prompt))
+            value = str(gameclock.ask(prompt))
         except ValueError:
             print("Incorrect format.")
             continue
@@ -602,7 +628,7 @@ def get_a_Coord(prompt):
     """
     while True:
         try:
-            value = str(input(prompt)).strip()
+            value = str(gameclock.ask(prompt)).strip()
         except ValueError:
             print ("Please enter a coordinate of the form A1")
             continue
@@ -648,7 +674,7 @@ def get_a_Coord(prompt):
         return Coord(x,y-1)
 
 def clear_screen():
-    os.system("cls" if os.name == 'nt' else "clear")
+    gameclock.clear_screen()
 
 def print_menu():
     print('''
@@ -678,7 +704,7 @@ def print_menu():
           '2. Two player\n'
           '3. Quit')
 
-def place_ships(player_name, gameboard):
+def place_ships(player_name, gameboard, rng=None):
     """Place ships.
 
     A method for regular human players to place his/her/ze's shipsself.
@@ -686,30 +712,21 @@ def place_ships(player_name, gameboard):
     Args:
         gameboard (Gameboard): The player's gameboard on which to place
             the ships.
+        rng (random.Random, optional): Used to auto place the ships, see AI.
 
     """
     clear_screen()
     print(f"{player_name}, place your ships")
 
-    orientations = ['h','v']
-
     #If you can't be bothered placing your ships (like me when I was testing)
     #get the computer to do it for you!
-    auto = input("Auto place ships? (y,n) ")
+    auto = gameclock.ask("Auto place ships? (y,n) ")
     if auto == 'y':
-        for ship in set(SHIP_LENGTHS.keys()) - set([s.type for s in gameboard.ships]):
-            ship_placed = False
-            while not ship_placed:
-                pos = Coord(randint(0,GAME_WIDTH-1), randint(0,GAME_HEIGHT-1))
-                o = orientations[randint(0,1)]
-
-                if gameboard.add_ship(pos=pos, type = ship, orientation=o, verbose=False) == False:
-                    pass
-                    #clear_screen()
-                else:
-                    ship_placed = True
+        #the AI places ships the same way, and with the same rng a seeded
+        #game places them the same every time
+        AI(rng).place_ships(gameboard)
         gameboard.print()
-        input("Press enter to continue...")
+        gameclock.ask("Press enter to continue...")
         return
 
     #OK, place the ships yourself
@@ -753,7 +770,7 @@ def turn(player_name, player_gameboard, enemy_gameboard):
 
     """
     clear_screen()
-    input(f"{player_name}'s turn.  Press enter to continue...")
+    gameclock.ask(f"{player_name}'s turn.  Press enter to continue...")
 
     #print the gameboard legend so the player knows what all those
     #'1's and '2's mean.
@@ -795,61 +812,76 @@ def turn(player_name, player_gameboard, enemy_gameboard):
     target = get_a_Coord("Choose a target (e.g. A1):")
     enemy_gameboard.fire(target, verbose=True)
 
-    input("Press enter to continue...")
+    gameclock.ask("Press enter to continue...")
 
 #This is where the execution actually starts
-clear_screen()
-p1 = Gameboard()
-p2 = Gameboard()
-
-print_menu()
-user_selection = get_an_int("Choose a game mode: ", 1, 3)
-if user_selection == 3:
-    quit()
-#single player
-elif user_selection == 1:
-    ai = AI()
-    ai.place_ships(p2)
-    place_ships("Player 1", p1)
-    game_over = False
-    while not game_over:
-        turn("Player 1", p1, p2)
-        if p2.defeated == True:
-            print(f"Player 1 wins!")
-            print(f"Player 1's ships:")
-            p1.print()
-            print(f"Admiral Meng's ships")
-            p2.print()
-            game_over = True
-            break;
-        ai.turn(p1)
-        if p1.defeated == True:
-            print(f"Admiral Meng wins!")
-            print(f"Admiral Meng's ships:")
-            p2.print()
-            print(f"Player 1's ships")
-            p1.print()
-            game_over = True
-#multiplayer
-elif user_selection == 2:
-    place_ships("Player 1", p1)
-    place_ships("Player 2", p2)
-    game_over = False
-    while not game_over:
-        turn("Player 1", p1, p2)
-        if p2.defeated == True:
-            print(f"Player 1 wins!")
-            print(f"Player 1's ships:")
-            p1.print()
-            print(f"Player 2's ships")
-            p2.print()
-            game_over = True
-            break;
-        turn("Player 2", p2, p1)
-        if p1.defeated == True:
-            print(f"Player 2 wins!")
-            print(f"Player 2's ships:")
-            p2.print()
-            print(f"Player 1's ships")
-            p1.print()
-            game_over = True
+def main(rng=None):
+    """Play a game.
+
+    Args:
+        rng (random.Random, optional): Used by the AI and for auto placing
+            ships.  Pass a seeded one to replay a game.
+
+    """
+    clear_screen()
+    p1 = Gameboard()
+    p2 = Gameboard()
+    if os.environ.get('BATTLESHEETS_SPECTATE'):
+        #only imported when someone's going to watch
+        from .spectate import feed_from_env
+        feed_from_env([p1, p2])
+
+    print_menu()
+    user_selection = get_an_int("Choose a game mode: ", 1, 3)
+    if user_selection == 3:
+        return
+    #single player
+    elif user_selection == 1:
+        ai = AI(rng)
+        ai.place_ships(p2)
+        place_ships("Player 1", p1, rng)
+        game_over = False
+        while not game_over:
+            turn("Player 1", p1, p2)
+            if p2.defeated == True:
+                print(f"Player 1 wins!")
+                print(f"Player 1's ships:")
+                p1.print()
+                print(f"Admiral Meng's ships")
+                p2.print()
+                game_over = True
+                break;
+            ai.turn(p1)
+            if p1.defeated == True:
+                print(f"Admiral Meng wins!")
+                print(f"Admiral Meng's ships:")
+                p2.print()
+                print(f"Player 1's ships")
+                p1.print()
+                game_over = True
+    #multiplayer
+    elif user_selection == 2:
+        place_ships("Player 1", p1, rng)
+        place_ships("Player 2", p2, rng)
+        game_over = False
+        while not game_over:
+            turn("Player 1", p1, p2)
+            if p2.defeated == True:
+                print(f"Player 1 wins!")
+                print(f"Player 1's ships:")
+                p1.print()
+                print(f"Player 2's ships")
+                p2.print()
+                game_over = True
+                break;
+            turn("Player 2", p2, p1)
+            if p1.defeated == True:
+                print(f"Player 2 wins!")
+                print(f"Player 2's ships:")
+                p2.print()
+                print(f"Player 1's ships")
+                p1.print()
+                game_over = True
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""Battlesheets, a blatant clone of Battleship.
+
+Run it from the top of the repository with python -m Battleships, see
+__main__.py for the other things it can run.
+
+Importing the package doesn't import the games; the names below are
+looked up the first time they're used, so
+
+    from Battleships import Gameboard
+
+only loads Battlesheets.py, and a bare import Battleships loads nothing.
+"""
+
+import importlib
+
+#name: module it lives in
+_LAZY = {
+    'AI': 'Battlesheets',
+    'Coord': 'Battlesheets',
+    'Gameboard': 'Battlesheets',
+    'Ocean': 'codecademy_battleship',
+}
+
+__all__ = sorted(_LAZY)
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module('.' + _LAZY[name], __name__), name)
+    globals()[name] = value #so it's only looked up once
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
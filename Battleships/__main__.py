@@ -0,0 +1,42 @@
+"""python -m Battleships [GAME] [options]
+
+    battlesheets    Battlesheets, against the computer or a friend (default)
+    codecademy      the Codecademy exercise, --solve to watch the solvers
+    benchmark       time a shot in each engine
+    shotlog         log the AI's shots and report on them
+    solver          the AI against the exact SolverAI
+    spectate        stream a game to watchers over the network
+
+Anything after GAME is passed on to it, e.g.
+
+    python -m Battleships codecademy --solve 1000
+"""
+
+import importlib
+import sys
+
+#command: module
+GAMES = {
+    'battlesheets': 'Battlesheets',
+    'codecademy': 'codecademy_battleship',
+    'benchmark': 'benchmark_engines',
+    'shotlog': 'shotlog',
+    'solver': 'solver',
+    'spectate': 'spectate',
+}
+DEFAULT = 'battlesheets'
+
+def main(argv=None):
+    args = list(sys.argv[1:] if argv is None else argv)
+    name = DEFAULT
+    if args and not args[0].startswith('-'):
+        name = args.pop(0)
+        if name not in GAMES:
+            sys.exit(f"Unknown game {name!r}, pick one of: {', '.join(GAMES)}")
+    #the game parses its own options and names itself in --help
+    sys.argv = [f"python -m {__package__} {name}"] + args
+    #only the chosen game is imported
+    importlib.import_module('.' + GAMES[name], __package__).main()
+
+if __name__ == '__main__':
+    main()
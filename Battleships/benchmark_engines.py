@@ -0,0 +1,58 @@
+"""Compare the cost of one shot in the two Battleship engines.
+
+codecademy_battleship.Ocean.guess is about the least work a shot can be,
+so it's the baseline for how fast Battlesheets.Gameboard.fire could get.
+Each engine fires at every square of fresh boards, in a random order,
+and the time per shot is reported.
+
+    python -m Battleships benchmark
+"""
+
+import random
+import time
+
+from . import codecademy_battleship as cc
+from .Battlesheets import AI, Coord, Gameboard, GAME_WIDTH, GAME_HEIGHT
+
+BOARDS = 2000
+
+def time_shots(make_board, fire, squares, rng):
+    """Seconds per shot, firing at every square of BOARDS fresh boards."""
+    total = 0.0
+    shots = 0
+    for _ in range(BOARDS):
+        board = make_board()
+        order = list(squares)
+        rng.shuffle(order)
+        start = time.perf_counter()
+        for square in order:
+            fire(board, square)
+        total += time.perf_counter() - start
+        shots += len(order)
+    return total / shots
+
+def main():
+    rng = random.Random(1)
+    ai = AI(rng)
+
+    def gameboard():
+        board = Gameboard()
+        ai.place_ships(board)
+        return board
+
+    results = [
+        ('Ocean.guess (5x5 bytearray)',
+         time_shots(lambda: cc.Ocean(rng=rng), lambda o, rc: o.guess(*rc),
+                    [(r, c) for r in range(cc.SIZE) for c in range(cc.SIZE)], rng)),
+        ('Gameboard.fire (10x10, 5 ships)',
+         time_shots(gameboard, lambda b, pos: b.fire(pos),
+                    [Coord(x, y) for x in range(GAME_WIDTH)
+                     for y in range(GAME_HEIGHT)], rng)),
+    ]
+    baseline = results[0][1]
+    for name, seconds in results:
+        print(f"{name:<32} {seconds * 1e9:10.0f} ns/shot  "
+              f"{seconds / baseline:6.1f}x")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""The Codecademy Battleship exercise, ported to Python 3.
+
+One ship, one square big, hidden on a 5x5 ocean, and four guesses to
+find it.  The game itself (Ocean) doesn't print or ask for anything, so
+it can be played by a solver or timed.  The board is a bytearray with
+one byte per square, b'O' for unknown and b'X' for a miss, so a guess is
+an index calculation and a byte compare.
+
+    python -m Battleships.codecademy_battleship            play it
+    python -m Battleships.codecademy_battleship --solve    watch the solvers
+"""
+
+import argparse
+import random
+
+import gameclock
+
+SIZE = 5
+TURNS = 4
+
+OCEAN = ord('O')
+GUESSED = ord('X')
+
+#what guess() can return
+HIT = 'hit'
+MISS = 'miss'
+ALREADY_GUESSED = 'already guessed'
+OFF_BOARD = 'off board'
+
+class Ocean(object):
+    """A board with one hidden ship.
+
+    Args:
+        size (Int): The board is size x size.
+        rng: Source of randomness for hiding the ship, random.Random or
+            alike.
+        ship (tuple): (row, col) of the ship, if you'd rather choose.
+
+    """
+    def __init__(self, size=SIZE, rng=random, ship=None):
+        self.size = size
+        self.board = bytearray([OCEAN]) * (size * size)
+        if ship is None:
+            ship = (rng.randint(0, size - 1), rng.randint(0, size - 1))
+        self.ship = ship[0] * size + ship[1]
+        self.guesses = 0
+        self.sunk = False
+
+    def guess(self, row, col):
+        """Fire at a square.
+
+        Returns:
+            HIT, MISS, ALREADY_GUESSED or OFF_BOARD.
+
+        """
+        size = self.size
+        if not (0 <= row < size and 0 <= col < size):
+            return OFF_BOARD
+        i = row * size + col
+        self.guesses += 1
+        if i == self.ship:
+            self.sunk = True
+            return HIT
+        if self.board[i] == GUESSED:
+            return ALREADY_GUESSED
+        self.board[i] = GUESSED
+        return MISS
+
+    def render(self):
+        """The board as text, a row per line, like print_board used to."""
+        size = self.size
+        return "\n".join(" ".join(chr(c) for c in self.board[r*size:(r+1)*size])
+                         for r in range(size))
+
+def random_solver(ocean, rng=random):
+    """Guess random squares (never the same one twice) until the ship sinks.
+
+    Returns:
+        The number of guesses it took.
+
+    """
+    squares = list(range(ocean.size * ocean.size))
+    rng.shuffle(squares)
+    for i in squares:
+        if ocean.guess(*divmod(i, ocean.size)) == HIT:
+            break
+    return ocean.guesses
+
+def systematic_solver(ocean):
+    """Sweep the board row by row until the ship sinks.
+
+    Returns:
+        The number of guesses it took.
+
+    """
+    for i in range(ocean.size * ocean.size):
+        if ocean.guess(*divmod(i, ocean.size)) == HIT:
+            break
+    return ocean.guesses
+
+def play(turns=TURNS):
+    """The original game, at the keyboard."""
+    ocean = Ocean()
+    for turn in range(turns):
+        print("Turn", turn + 1)
+        print(ocean.render())
+        guess_row = int(gameclock.ask("Guess Row: "))
+        guess_col = int(gameclock.ask("Guess Col: "))
+
+        result = ocean.guess(guess_row, guess_col)
+        if result == HIT:
+            print("Congratulations! You sank my battleship!")
+            break
+        if result == OFF_BOARD:
+            print("Oops, that's not even in the ocean.")
+        elif result == ALREADY_GUESSED:
+            print("You guessed that one already.")
+        else:
+            print("You missed my battleship!")
+        if turn == turns - 1:
+            print("Game Over")
+        print(ocean.render())
+
+def main():
+    parser = argparse.ArgumentParser(description="Codecademy Battleship.")
+    parser.add_argument('--solve', type=int, nargs='?', const=10000,
+                        metavar='GAMES',
+                        help="let the solvers play instead, and say how they did")
+    args = parser.parse_args()
+    if not args.solve:
+        play()
+        return
+    rng = random.Random()
+    for name, solver in (('random', lambda o: random_solver(o, rng)),
+                         ('systematic', systematic_solver)):
+        guesses = [solver(Ocean(rng=rng)) for _ in range(args.solve)]
+        found = sum(g <= TURNS for g in guesses) / len(guesses)
+        print(f"{name:>10}: {sum(guesses) / len(guesses):.2f} guesses on "
+              f"average, found within {TURNS} turns {found:.1%} of the time")
+
+if __name__ == '__main__':
+    main()
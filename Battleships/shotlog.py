@@ -0,0 +1,402 @@
+"""Record every shot of many Battlesheets games, and ask questions of them.
+
+A ShotLog watches Gameboards (through Gameboard.listeners) and keeps a
+row per shot:
+
+    game      which game, numbered from 0 across the whole log
+    turn      1 for the first shot at that board, 2 for the next...
+    x, y      the square
+    result    MISS_CODE, HIT or SUNK
+    ship      index into SHIP_TYPES of the ship that was hit, -1 for a miss
+    strategy  index into the log's strategy names (AI.strategy)
+
+Rows are buffered in memory a column at a time, and every `batch` rows
+are handed to a background thread that writes them out as one chunk file
+in the log's directory: Parquet if pyarrow is installed, otherwise a
+NumPy .npy file.  Chunks are only ever added, never rewritten, so a log
+can be read while it's being written.
+
+    with ShotLog('shots') as log:
+        for game in range(1000):
+            board = Gameboard()
+            ai.place_ships(board)
+            log.watch(board, ai.strategy)
+            while not board.defeated:
+                ai.turn(board)
+
+    shots = load('shots')
+    heatmap(shots)          #hit rate of each square
+    shots_to_sink(shots)    #shots from first hit to sinking, per ship
+
+The queries work on whole columns at once rather than replaying games,
+so millions of games take seconds.
+
+    python -m Battleships shotlog simulate shots --games 100000
+    python -m Battleships shotlog report shots
+"""
+
+import argparse
+import array
+import json
+import os
+import queue
+import random
+import threading
+import time
+
+import lazyimport
+from .Battlesheets import (AI, Gameboard, GAME_WIDTH, GAME_HEIGHT, SUNK, MISS,
+                           SHIP_LENGTHS)
+
+np = lazyimport.lazy_import('numpy')
+
+#ships are logged, and sent to spectators, as their index in SHIP_TYPES
+SHIP_TYPES = list(SHIP_LENGTHS)
+SHIP_CODES = {ship: i for i, ship in enumerate(SHIP_TYPES)}
+
+#MISS is a backslash on the board; in the log it's a number like the rest
+MISS_CODE = 0
+
+#name, array.array typecode for the buffer, NumPy dtype on disk
+COLUMNS = (('game', 'q', 'int64'),
+           ('turn', 'h', 'int16'),
+           ('x', 'b', 'int8'),
+           ('y', 'b', 'int8'),
+           ('result', 'b', 'int8'),
+           ('ship', 'b', 'int8'),
+           ('strategy', 'h', 'int16'))
+
+#the log's own bookkeeping: strategy names, games and chunks so far
+META = 'shotlog.json'
+
+def _arrow():
+    """pyarrow, with pyarrow.parquet loaded, or None if it isn't installed."""
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError:
+        return None
+    return pyarrow
+
+def read_meta(path):
+    """The bookkeeping of the log in `path`, or that of an empty log."""
+    try:
+        with open(os.path.join(path, META)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {'strategies': [], 'games': 0, 'chunks': 0}
+
+class ShotLog(object):
+    """An append-only, columnar log of shots.
+
+    Not thread safe: watch boards and fire at them from one thread.  Only
+    one ShotLog should have a directory open at a time.
+
+    Args:
+        path (Str): Directory to keep the log in.  Made if needed.  If it
+            already holds a log, new games are numbered after the old ones.
+        batch (Int): Rows per chunk file.
+        format (Str, optional): 'parquet' or 'npy'.  Defaults to parquet
+            if pyarrow is installed, npy if not.
+
+    """
+    def __init__(self, path, batch=1000000, format=None):
+        if format is None:
+            format = 'parquet' if _arrow() else 'npy'
+        if format not in ('parquet', 'npy'):
+            raise ValueError(f"Unknown format {format!r}, use parquet or npy")
+        if format == 'parquet' and _arrow() is None:
+            raise ImportError("Writing Parquet needs pyarrow, use format='npy'")
+        os.makedirs(path, exist_ok=True)
+        self.path = path
+        self.batch = batch
+        self.format = format
+        meta = read_meta(path)
+        self.strategies = meta['strategies']
+        self.games = meta['games']
+        self.chunks = meta['chunks']
+        self._buffers = self._empty_buffers()
+        self._rows = 0
+        #bounded, so if the disk can't keep up the games wait for it
+        #rather than piling up chunks in memory
+        self._queue = queue.Queue(maxsize=4)
+        self._error = None
+        self._writer = threading.Thread(target=self._write_chunks,
+                                        name='shotlog-writer', daemon=True)
+        self._writer.start()
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def _empty_buffers(self):
+        return [array.array(typecode) for _, typecode, _ in COLUMNS]
+
+    def strategy_code(self, strategy):
+        """The number `strategy` is stored as, adding it if it's new."""
+        try:
+            return self.strategies.index(strategy)
+        except ValueError:
+            self.strategies.append(strategy)
+            return len(self.strategies) - 1
+
+    def watch(self, board, strategy):
+        """Record every shot at `board` from now on, as a new game.
+
+        Args:
+            board (Gameboard): The board being fired at.
+            strategy (Str): Who's firing, usually the AI's strategy.
+
+        Returns:
+            The game's id.
+
+        """
+        game = self.games
+        self.games += 1
+        code = self.strategy_code(strategy)
+        turn = 0
+
+        def record(pos, result, ship):
+            nonlocal turn
+            turn += 1
+            self.record(game, turn, pos[0], pos[1],
+                        MISS_CODE if result == MISS else result,
+                        -1 if ship is None else SHIP_CODES[ship.type], code)
+
+        board.listeners.append(record)
+        return game
+
+    def record(self, game, turn, x, y, result, ship, strategy):
+        """Add one row.  Usually watch() calls this for you."""
+        b = self._buffers
+        b[0].append(game)
+        b[1].append(turn)
+        b[2].append(x)
+        b[3].append(y)
+        b[4].append(result)
+        b[5].append(ship)
+        b[6].append(strategy)
+        self._rows += 1
+        if self._rows >= self.batch:
+            self.flush()
+
+    def flush(self):
+        """Hand the buffered rows to the writer thread."""
+        if self._error is not None:
+            raise self._error
+        if self._rows:
+            ext = 'parquet' if self.format == 'parquet' else 'npy'
+            name = os.path.join(self.path, f"part-{self.chunks:05d}.{ext}")
+            self._queue.put((name, self._buffers))
+            self.chunks += 1
+            self._buffers = self._empty_buffers()
+            self._rows = 0
+        self._write_meta()
+
+    def close(self):
+        """Write out everything and stop the writer thread."""
+        if self.closed:
+            return
+        self.flush()
+        self._queue.put(None)
+        self._writer.join()
+        self.closed = True
+        if self._error is not None:
+            raise self._error
+
+    def _write_meta(self):
+        meta = {'strategies': self.strategies, 'games': self.games,
+                'chunks': self.chunks}
+        name = os.path.join(self.path, META)
+        with open(name + '.tmp', 'w') as f:
+            json.dump(meta, f)
+        os.replace(name + '.tmp', name)
+
+    def _write_chunks(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            if self._error is not None:
+                continue #keep emptying the queue so flush() doesn't block
+            name, buffers = item
+            try:
+                columns = {column[0]: np.frombuffer(buffer, dtype=column[2])
+                           for column, buffer in zip(COLUMNS, buffers)}
+                #written under another name and renamed, so a reader
+                #never sees half a chunk
+                if self.format == 'parquet':
+                    pa = _arrow()
+                    pa.parquet.write_table(pa.table(columns), name + '.tmp')
+                else:
+                    rows = np.empty(len(columns['game']),
+                                    dtype=[(n, dt) for n, _, dt in COLUMNS])
+                    for column, values in columns.items():
+                        rows[column] = values
+                    with open(name + '.tmp', 'wb') as f:
+                        np.save(f, rows)
+                os.replace(name + '.tmp', name)
+            except Exception as e:
+                self._error = e
+
+class Shots(object):
+    """Every row of a log, a NumPy array per column: shots.game, shots.x...
+
+    Args:
+        columns (dict): Column name: array, for every name in COLUMNS.
+        strategies (list): Strategy names, by code.
+
+    """
+    def __init__(self, columns, strategies):
+        for name, _, _ in COLUMNS:
+            setattr(self, name, columns[name])
+        self.strategies = strategies
+
+    def __len__(self):
+        return len(self.game)
+
+    def select(self, mask):
+        """The rows where `mask` (a boolean array) is True."""
+        return Shots({name: getattr(self, name)[mask] for name, _, _ in COLUMNS},
+                     self.strategies)
+
+    def by_strategy(self, strategy):
+        """The shots fired by `strategy`."""
+        return self.select(self.strategy == self.strategies.index(strategy))
+
+def load(path):
+    """Read the log in `path` into a Shots."""
+    chunks = sorted(name for name in os.listdir(path)
+                    if name.startswith('part-')
+                    and name.endswith(('.npy', '.parquet')))
+    parts = {name: [] for name, _, _ in COLUMNS}
+    for chunk in chunks:
+        file = os.path.join(path, chunk)
+        if chunk.endswith('.npy'):
+            rows = np.load(file)
+            for name in parts:
+                parts[name].append(rows[name])
+        else:
+            pa = _arrow()
+            if pa is None:
+                raise ImportError(f"Reading {file} needs pyarrow")
+            table = pa.parquet.read_table(file)
+            for name in parts:
+                parts[name].append(table.column(name).to_numpy())
+    columns = {}
+    for name, _, dtype in COLUMNS:
+        columns[name] = (np.concatenate(parts[name]) if parts[name]
+                         else np.empty(0, dtype=dtype))
+    return Shots(columns, read_meta(path)['strategies'])
+
+def heatmap(shots):
+    """How often a shot at each square hits.
+
+    Returns:
+        A GAME_HEIGHT x GAME_WIDTH array of hit rates, indexed [y, x].
+        Squares never fired at are NaN.
+
+    """
+    cells = shots.y.astype(np.int64) * GAME_WIDTH + shots.x
+    size = GAME_WIDTH * GAME_HEIGHT
+    fired = np.bincount(cells, minlength=size)
+    hits = np.bincount(cells, weights=shots.result != MISS_CODE, minlength=size)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        rate = hits / fired
+    return rate.reshape(GAME_HEIGHT, GAME_WIDTH)
+
+def shots_to_sink(shots):
+    """Shots from the first hit on a ship to sinking it, misses included.
+
+    Only ships that were sunk count.
+
+    Returns:
+        Two arrays: the ship (index into SHIP_TYPES) and how many shots
+        it took, one entry per ship sunk.
+
+    """
+    hit = shots.result != MISS_CODE
+    key = shots.game[hit] * len(SHIP_TYPES) + shots.ship[hit]
+    keys, inverse = np.unique(key, return_inverse=True)
+    first_hit = np.full(len(keys), np.iinfo(np.int64).max)
+    np.minimum.at(first_hit, inverse, shots.turn[hit])
+    sunk_at = np.full(len(keys), np.iinfo(np.int64).max)
+    sunk = shots.result[hit] == SUNK
+    np.minimum.at(sunk_at, inverse[sunk], shots.turn[hit][sunk])
+    done = sunk_at != np.iinfo(np.int64).max
+    return keys[done] % len(SHIP_TYPES), (sunk_at - first_hit + 1)[done]
+
+def game_lengths(shots):
+    """How many shots each game took (or has taken so far), by game id."""
+    games = np.zeros(shots.game.max() + 1 if len(shots) else 0, dtype=np.int64)
+    np.maximum.at(games, shots.game, shots.turn)
+    return games[np.bincount(shots.game, minlength=len(games)) > 0]
+
+def simulate(path, games, seed=None, batch=1000000, format=None):
+    """Let the AI sink `games` fleets and log every shot."""
+    rng = random.Random(seed)
+    with ShotLog(path, batch=batch, format=format) as log:
+        for _ in range(games):
+            ai = AI(rng)
+            board = Gameboard()
+            ai.place_ships(board)
+            log.watch(board, ai.strategy)
+            for _ in range(GAME_WIDTH * GAME_HEIGHT):
+                ai.turn(board)
+                if board.defeated:
+                    break
+
+def report(shots):
+    """Print the heatmap and the shots-to-sink numbers."""
+    rate = heatmap(shots)
+    print("Hit rate by square, %")
+    print("   " + "  ".join("ABCDEFGHIJ"[:GAME_WIDTH]))
+    for y in range(GAME_HEIGHT):
+        print(f"{y + 1:2}|" + "|".join("  " if np.isnan(r) else f"{min(r * 100, 99):2.0f}"
+                                      for r in rate[y]) + "|")
+    lengths = game_lengths(shots)
+    if len(lengths):
+        p10, p50, p90 = np.percentile(lengths, [10, 50, 90])
+        print(f"\n{len(lengths):,} games, shots per game: mean {lengths.mean():.1f}"
+              f"  p10/p50/p90 {p10:.0f}/{p50:.0f}/{p90:.0f}")
+    ships, taken = shots_to_sink(shots)
+    print("\nShots from first hit to sunk")
+    for code, ship in enumerate(SHIP_TYPES):
+        mine = taken[ships == code]
+        if len(mine):
+            print(f"{ship:>10} ({SHIP_LENGTHS[ship]}): mean {mine.mean():.2f}"
+                  f"  p90 {np.percentile(mine, 90):.0f}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Log and analyse Battlesheets shots.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    sim = commands.add_parser('simulate', help="let the AI play and log its shots")
+    sim.add_argument('path', help="directory of the log")
+    sim.add_argument('--games', type=int, default=10000)
+    sim.add_argument('--seed', type=int)
+    sim.add_argument('--batch', type=int, default=1000000, help="rows per chunk file")
+    sim.add_argument('--format', choices=('parquet', 'npy'))
+    rep = commands.add_parser('report', help="heatmap and shots-to-sink of a log")
+    rep.add_argument('path', help="directory of the log")
+    rep.add_argument('--strategy', help="only the shots of this strategy")
+    args = parser.parse_args()
+
+    if args.command == 'simulate':
+        start = time.perf_counter()
+        simulate(args.path, args.games, args.seed, args.batch, args.format)
+        seconds = time.perf_counter() - start
+        print(f"{args.games:,} games in {seconds:.1f}s "
+              f"({args.games / seconds:,.0f} games/s)")
+    else:
+        start = time.perf_counter()
+        shots = load(args.path)
+        if args.strategy:
+            shots = shots.by_strategy(args.strategy)
+        report(shots)
+        print(f"\n{len(shots):,} shots analysed in {time.perf_counter() - start:.2f}s")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,371 @@
+"""An AI that works out exactly where the enemy ships can be.
+
+Given the shots so far (the HIT, MISS and SUNK squares) and which ships
+are still afloat, every way of laying out those ships that fits is
+equally likely.  Counting, for each square, how many of those layouts
+put a ship there gives the exact chance of a hit there, and SolverAI
+simply fires at the best square.  No sampling, so it's as strong as
+this kind of player gets: a ceiling to measure AI.turn against.
+
+There are far too many layouts to list, so they're counted a row at a
+time.  Going down the board, all that matters about the rows already
+done is
+
+    the fleet       which ships haven't been placed yet
+    the profile     for each column, how many more squares a vertical
+                    ship coming down from above still needs
+
+so layouts that agree on those are counted together.  What can go in
+one row depends only on (fleet, profile) and the row's squares, which
+are kept as bitmasks: `blocked` for MISS and SUNK squares, `hits` for
+HIT squares that a ship must cover.  Those row subproblems are
+memoised, and as one shot only changes one row, most of them carry over
+from turn to turn (and from game to game).
+
+A pass down the board counts the ways to reach each state, a pass back
+up counts the ways to finish from it, and their product over every way
+through a row gives the count for each square in it.
+
+The number of states still grows with every ship that's left to place:
+with the whole fleet on an open board it's minutes of work.  So
+SolverAI only counts exactly while that stays under `max_states`, which
+by default is from twenty-odd shots in (and the endgame takes a few
+milliseconds a shot).  Before then it uses placement_density(), which
+places each ship on its own and ignores the others.
+
+    python -m Battleships solver --games 100    AI against SolverAI
+"""
+
+import argparse
+import random
+import time
+
+from .Battlesheets import (AI, Coord, Gameboard, GAME_WIDTH, GAME_HEIGHT,
+                           HIT, SUNK, MISS, SHIP_LENGTHS)
+
+class TooManyStates(Exception):
+    """Counting would take longer than the caller is prepared to wait."""
+
+def _without(fleet, length):
+    """The fleet (a sorted tuple of ship lengths) minus one ship of `length`."""
+    i = fleet.index(length)
+    return fleet[:i] + fleet[i + 1:]
+
+class PlacementCounter(object):
+    """Counts the layouts of a fleet that fit the shots so far.
+
+    One counter can be shared by any number of AIs and games; sharing it
+    shares its memo.
+
+    Args:
+        width (Int), height (Int): Size of the board.
+        max_memo (Int): Forget the memo when it holds this many rows.
+
+    """
+    def __init__(self, width=GAME_WIDTH, height=GAME_HEIGHT, max_memo=500000):
+        self.width = width
+        self.height = height
+        self.max_memo = max_memo
+        #(fleet, profile, blocked, hits, rows left): [(fleet, profile, occupied)]
+        self._rows = {}
+
+    def _transitions(self, fleet, profile, blocked, hits, rows_left):
+        """Every way to fill one row.
+
+        Args:
+            fleet (tuple): Lengths of the ships not placed yet, sorted.
+            profile (tuple): Per column, squares still owed by a vertical
+                ship from above (0 for none).
+            blocked (Int), hits (Int): The row's MISS/SUNK and HIT
+                squares, bit x for column x.
+            rows_left (Int): Rows from this one to the bottom, capped at
+                the longest ship, which is as far as it matters.
+
+        Returns:
+            A list of (fleet, profile, occupied) for the next row, where
+            occupied is a bitmask of the squares filled in this row.
+
+        """
+        key = (fleet, profile, blocked, hits, rows_left)
+        found = self._rows.get(key)
+        if found is not None:
+            return found
+
+        width = self.width
+        result = []
+        above = 0 #squares taken by ships coming down from above
+        for x, owed in enumerate(profile):
+            if owed:
+                above |= 1 << x
+        out = [owed - 1 if owed else 0 for owed in profile]
+
+        def fill(x, fleet, occupied):
+            if x == width:
+                if hits & ~occupied == 0:
+                    result.append((fleet, tuple(out), occupied))
+                return
+            bit = 1 << x
+            if above & bit:
+                fill(x + 1, fleet, occupied)
+                return
+            #leave the square empty
+            if not hits & bit:
+                fill(x + 1, fleet, occupied)
+            if blocked & bit:
+                return
+            #or start a ship here
+            for length in sorted(set(fleet)):
+                rest = _without(fleet, length)
+                if length <= rows_left:
+                    out[x] = length - 1
+                    fill(x + 1, rest, occupied | bit)
+                    out[x] = 0
+                squares = ((1 << length) - 1) << x
+                if x + length <= width and not squares & (blocked | above):
+                    fill(x + length, rest, occupied | squares)
+
+        #a ship from above can't go through a miss
+        if not above & blocked:
+            fill(0, fleet, above)
+        if len(self._rows) >= self.max_memo:
+            self._rows.clear()
+        self._rows[key] = result
+        return result
+
+    def count(self, blocked, hits, fleet, max_states=None):
+        """Count layouts, in total and per square.
+
+        Args:
+            blocked (list): Per row, bitmask of squares no ship can be on.
+            hits (list): Per row, bitmask of squares a ship must be on.
+            fleet (iterable): Lengths of the ships to place.
+            max_states (Int, optional): Give up if more than this many
+                states are reached at any row.
+
+        Returns:
+            (total, counts) where counts[y][x] is how many of the total
+            layouts have a ship at (x, y).
+
+        Raises:
+            TooManyStates: If max_states is exceeded.
+
+        """
+        width, height = self.width, self.height
+        fleet = tuple(sorted(fleet))
+        longest = max(fleet, default=0)
+        empty = (0,) * width
+
+        def ways(y, state):
+            return self._transitions(state[0], state[1], blocked[y], hits[y],
+                                     min(height - y, longest))
+
+        #down: forward[y][state] is the number of ways to reach row y in state
+        forward = [{(fleet, empty): 1}]
+        for y in range(height):
+            reached = {}
+            room = (height - y - 1) * width
+            for state, n in forward[y].items():
+                for next_fleet, profile, _ in ways(y, state):
+                    #no point going on if the rest can't fit below
+                    if sum(next_fleet) > room:
+                        continue
+                    key = (next_fleet, profile)
+                    reached[key] = reached.get(key, 0) + n
+            if max_states is not None and len(reached) > max_states:
+                raise TooManyStates(f"{len(reached)} states at row {y + 1}")
+            forward.append(reached)
+
+        end = ((), empty)
+        total = forward[height].get(end, 0)
+        counts = [[0] * width for _ in range(height)]
+        if not total:
+            return 0, counts
+
+        #up: finish[state] is the number of ways to finish from the row below
+        finish = {end: 1}
+        for y in reversed(range(height)):
+            row = counts[y]
+            here = {}
+            for state, n in forward[y].items():
+                ways_on = 0
+                for next_fleet, profile, occupied in ways(y, state):
+                    m = finish.get((next_fleet, profile))
+                    if not m:
+                        continue
+                    ways_on += m
+                    w = n * m
+                    while occupied:
+                        low = occupied & -occupied
+                        row[low.bit_length() - 1] += w
+                        occupied ^= low
+                if ways_on:
+                    here[state] = ways_on
+            finish = here
+        return total, counts
+
+    def probabilities(self, gameboard):
+        """The chance of a ship at each square of `gameboard`, as [y][x].
+
+        Only uses what the player firing at the board knows: where the
+        shots landed and which ships have been announced sunk.
+
+        """
+        total, counts = self.count(*board_constraints(gameboard))
+        if not total:
+            return [[0.0] * self.width for _ in range(self.height)]
+        return [[c / total for c in row] for row in counts]
+
+def board_constraints(gameboard):
+    """(blocked, hits, fleet) for PlacementCounter.count, from a Gameboard."""
+    blocked = [0] * GAME_HEIGHT
+    hits = [0] * GAME_HEIGHT
+    for pos, status in gameboard.get_hits_and_misses().items():
+        if status == HIT:
+            hits[pos[1]] |= 1 << pos[0]
+        elif status in (MISS, SUNK):
+            blocked[pos[1]] |= 1 << pos[0]
+    sunk = {ship.type for ship in gameboard.ships if ship.sunk}
+    fleet = [length for ship, length in SHIP_LENGTHS.items() if ship not in sunk]
+    return blocked, hits, fleet
+
+def _placements(width, height, length):
+    """Bitmasks (bit y*width + x) of every way to put a ship on the board."""
+    across = (1 << length) - 1
+    down = sum(1 << (i * width) for i in range(length))
+    masks = []
+    for y in range(height):
+        for x in range(width):
+            if x + length <= width:
+                masks.append(across << (y * width + x))
+            if y + length <= height:
+                masks.append(down << (y * width + x))
+    return masks
+
+def placement_density(blocked, hits, fleet, width=GAME_WIDTH, height=GAME_HEIGHT):
+    """A quick stand-in for PlacementCounter.count.
+
+    Each ship is placed on its own, anywhere it doesn't cross a blocked
+    square, and the placements covering each square are counted.  While
+    there are HIT squares, only placements through them count, weighted
+    by how many they go through.
+
+    Takes the same arguments as count() and returns counts[y][x].
+
+    """
+    all_blocked = sum(row << (y * width) for y, row in enumerate(blocked))
+    all_hits = sum(row << (y * width) for y, row in enumerate(hits))
+    cells = [0] * (width * height)
+    for length in fleet:
+        for mask in _placements(width, height, length):
+            if mask & all_blocked:
+                continue
+            weight = 1
+            if all_hits:
+                weight = bin(mask & all_hits).count('1')
+                if not weight:
+                    continue
+            while mask:
+                low = mask & -mask
+                cells[low.bit_length() - 1] += weight
+                mask ^= low
+    return [cells[y * width:(y + 1) * width] for y in range(height)]
+
+#shared by every SolverAI unless it's given its own
+_counter = None
+
+def default_counter():
+    global _counter
+    if _counter is None:
+        _counter = PlacementCounter()
+    return _counter
+
+class SolverAI(AI):
+    """Fires at the square most likely to hold a ship.
+
+    Places its ships the same way as AI.
+
+    Args:
+        rng (random.Random, optional): Breaks ties between equally good
+            squares, and places ships.  See AI.
+        counter (PlacementCounter, optional): Defaults to one shared by
+            all SolverAIs.
+        max_states (Int, optional): How big a count to attempt; past
+            that placement_density() is used.  None always counts
+            exactly, however long it takes.
+
+    """
+    strategy = 'exact'
+
+    def __init__(self, rng=None, counter=None, max_states=2000):
+        super().__init__(rng)
+        self.counter = counter if counter is not None else default_counter()
+        self.max_states = max_states
+        self.shots = 0
+        self.exact_shots = 0 #shots aimed with an exact count
+
+    def turn(self, enemy_gameboard):
+        """Play a turn of the game.
+
+        Args:
+            enemy_gameboard (Gameboard): The opponent's gameboard.
+
+        """
+        fired = enemy_gameboard.get_hits_and_misses()
+        blocked, hits, fleet = board_constraints(enemy_gameboard)
+        self.shots += 1
+        try:
+            total, counts = self.counter.count(blocked, hits, fleet,
+                                               self.max_states)
+            self.exact_shots += 1
+        except TooManyStates:
+            counts = placement_density(blocked, hits, fleet)
+            total = sum(map(sum, counts))
+        best, targets = 0, []
+        for y, row in enumerate(counts):
+            for x, n in enumerate(row):
+                if n < best or Coord(x, y) in fired:
+                    continue
+                if n > best:
+                    best, targets = n, []
+                targets.append(Coord(x, y))
+        if not total or not targets:
+            #the shots don't fit any layout (someone cheated?), so guess
+            super().turn(enemy_gameboard)
+            return
+        enemy_gameboard.fire(targets[self.rng.randint(0, len(targets) - 1)],
+                             verbose=False)
+
+def play(ai, rng):
+    """Let `ai` sink a fleet placed by AI, and return how many shots it took."""
+    board = Gameboard()
+    AI(rng).place_ships(board)
+    shots = 0
+    while not board.defeated and shots < GAME_WIDTH * GAME_HEIGHT:
+        ai.turn(board)
+        shots += 1
+    return shots
+
+def main():
+    parser = argparse.ArgumentParser(description="Play AI against SolverAI.")
+    parser.add_argument('--games', type=int, default=100)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--max-states', type=int, default=2000,
+                        help="largest exact count SolverAI attempts")
+    args = parser.parse_args()
+    for player in (AI, SolverAI):
+        rng = random.Random(args.seed)
+        ai = player(random.Random(args.seed))
+        if isinstance(ai, SolverAI):
+            ai.max_states = args.max_states
+        start = time.perf_counter()
+        shots = sorted(play(ai, rng) for _ in range(args.games))
+        seconds = time.perf_counter() - start
+        print(f"{player.strategy:>12}: {sum(shots) / len(shots):5.1f} shots per "
+              f"game, median {shots[len(shots) // 2]}, worst {shots[-1]}  "
+              f"({seconds / sum(shots) * 1e3:.2f} ms per shot)")
+        if isinstance(ai, SolverAI):
+            print(f"{'':>12}  {ai.exact_shots / ai.shots:.0%} of shots "
+                  f"aimed with an exact count")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,397 @@
+"""Let people watch a Battlesheets game over the network.
+
+Rather than sending the boards after every turn, a SpectatorFeed sends
+one small event per shot, as Gameboard.fire() happens (it listens on
+Gameboard.listeners):
+
+    seq     uint32  events are numbered from 0, so gaps show
+    board   uint8   which watched board was fired at, in watch() order
+    x, y    uint8   the square
+    result  uint8   MISS_CODE, HIT or SUNK
+    ship    uint8   index into shotlog.SHIP_TYPES of a sunk ship, NO_SHIP otherwise
+
+A hit doesn't say which ship was hit, since the players can't see that
+either.  When a ship sinks there's a SUNK event for the square that sank
+it and then one for each of its other squares, so a watcher can keep the
+boards up to date from the events alone.  A new watcher first gets
+HEADER and every event so far, then live events.
+
+Each event is encoded once into a shared buffer.  Events that arrive
+together (the AI fires faster than the loop turns round) are sent as
+one chunk, and that same bytes object is written to every watcher, so
+the cost is one small write per watcher whatever the size of the board.
+A watcher that falls more than `max_backlog` bytes behind is
+disconnected rather than buffered for.
+
+The feed runs an asyncio server, normally on a thread of its own so the
+game can carry on as usual:
+
+    feed = SpectatorFeed()
+    feed.watch(p1)
+    feed.watch(p2)
+    feed.start(port=8765)
+    ...play...
+    feed.close()
+
+Set BATTLESHEETS_SPECTATE to [host:]port and Battlesheets.main() does
+that for you.
+
+    python -m Battleships spectate serve --port 8765     an AI against AI game
+    python -m Battleships spectate watch --port 8765     watch it
+    python -m Battleships spectate bench --watchers 2000 loopback timing
+"""
+
+import argparse
+import asyncio
+import collections
+import os
+import random
+import struct
+import threading
+import time
+
+import gameclock
+from .Battlesheets import AI, Gameboard, GAME_WIDTH, GAME_HEIGHT, SUNK, MISS
+from .shotlog import SHIP_CODES, MISS_CODE
+
+NO_SHIP = 255
+
+EVENT = struct.Struct('>IBBBBB')
+#sent to every watcher first: a magic number and the board size
+HEADER = struct.pack('>4sBB', b'BSF1', GAME_WIDTH, GAME_HEIGHT)
+
+Event = collections.namedtuple('Event', 'seq board x y result ship')
+
+def encode(seq, board, x, y, result, ship):
+    return EVENT.pack(seq, board, x, y, result, ship)
+
+def decode(data):
+    return Event(*EVENT.unpack(data))
+
+class SpectatorFeed(object):
+    """Streams the shots at some Gameboards to anyone who connects.
+
+    Args:
+        max_backlog (Int): Bytes a watcher may fall behind by before
+            it's dropped.
+
+    """
+    def __init__(self, max_backlog=64 * 1024):
+        self.max_backlog = max_backlog
+        self.history = bytearray(HEADER) #what a new watcher is sent first
+        self.watchers = set()
+        self.boards = 0
+        self.dropped = 0
+        self.fan_out_seconds = 0.0 #time spent sending events, for bench
+        self._seq = 0
+        self._pending = bytearray() #events not sent to the watchers yet
+        self._loop = None
+        self._server = None
+        self._thread = None
+
+    def watch(self, board, number=None):
+        """Stream the shots at `board` from now on.
+
+        Args:
+            board (Gameboard): The board to watch.
+            number (Int, optional): The board's number in the events, 0 to
+                254.  Defaults to the next one.
+
+        Returns:
+            The board's number.
+
+        """
+        if number is None:
+            number = self.boards
+        self.boards = max(self.boards, number + 1)
+
+        sunk = set() #ids of the ships on this board already shown sunk
+
+        def shot(pos, result, ship):
+            squares = [pos]
+            if result == SUNK:
+                code = SHIP_CODES[ship.type]
+                if id(ship) not in sunk:
+                    sunk.add(id(ship))
+                    squares += [p for p in ship.points if p != pos]
+            else:
+                code = NO_SHIP
+            data = b''.join(
+                encode(self._seq + i, number, square[0], square[1],
+                       MISS_CODE if result == MISS else result, code)
+                for i, square in enumerate(squares))
+            self._seq += len(squares)
+            self.publish(data)
+
+        board.listeners.append(shot)
+        return number
+
+    def publish(self, data):
+        """Send encoded events to every watcher.  Safe from any thread."""
+        if self._loop is None:
+            self.history += data #nobody can be watching yet
+        else:
+            self._loop.call_soon_threadsafe(self._add, data)
+
+    def _add(self, data):
+        #this and _fan_out only ever run on the event loop, so history,
+        #_pending and watchers don't change underneath them
+        self.history += data
+        if not self._pending:
+            self._loop.call_soon(self._fan_out)
+        self._pending += data
+
+    def _fan_out(self):
+        start = time.perf_counter()
+        data = bytes(self._pending)
+        self._pending.clear()
+        max_backlog = self.max_backlog
+        for writer in list(self.watchers):
+            transport = writer.transport
+            if transport.is_closing():
+                self.watchers.discard(writer)
+            elif transport.get_write_buffer_size() > max_backlog:
+                self.watchers.discard(writer)
+                self.dropped += 1
+                transport.abort()
+            else:
+                transport.write(data)
+        self.fan_out_seconds += time.perf_counter() - start
+
+    async def _subscribe(self, reader, writer):
+        #the pending events go to every watcher, this one included, at
+        #the next _fan_out, so they're left out of the catch-up
+        writer.write(bytes(self.history[:len(self.history) - len(self._pending)]))
+        self.watchers.add(writer)
+        try:
+            #watchers don't say anything; wait for them to hang up
+            while await reader.read(1024):
+                pass
+        except ConnectionError:
+            pass
+        finally:
+            self.watchers.discard(writer)
+            writer.close()
+
+    async def serve(self, host='localhost', port=0, backlog=1024):
+        """Start listening on the running event loop.
+
+        Args:
+            host (Str), port (Int): Where to listen.  Port 0 picks a free one.
+            backlog (Int): Connections that can be waiting to be accepted.
+                Too few and a crowd arriving at once is kept waiting for
+                seconds while their connections are retried.
+
+        Returns:
+            The port.
+
+        """
+        self._loop = asyncio.get_running_loop()
+        self._server = await asyncio.start_server(self._subscribe, host, port,
+                                                  backlog=backlog)
+        return self._server.sockets[0].getsockname()[1]
+
+    def start(self, host='localhost', port=0):
+        """serve() on an event loop in a background thread.
+
+        Returns:
+            The port.
+
+        """
+        ready = threading.Event()
+        result = {}
+
+        def run():
+            loop = asyncio.new_event_loop()
+            try:
+                result['port'] = loop.run_until_complete(self.serve(host, port))
+            except Exception as e:
+                result['error'] = e
+                ready.set()
+                return
+            ready.set()
+            loop.run_forever()
+            loop.close()
+
+        self._thread = threading.Thread(target=run, name='spectator-feed',
+                                        daemon=True)
+        self._thread.start()
+        ready.wait()
+        if 'error' in result:
+            raise result['error']
+        return result['port']
+
+    async def aclose(self):
+        """Stop listening and disconnect the watchers."""
+        if self._server is not None:
+            self._server.close()
+            for writer in list(self.watchers):
+                writer.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    def close(self):
+        """Shut down the background thread that start() made."""
+        if self._thread is None:
+            return
+        loop = self._loop
+        asyncio.run_coroutine_threadsafe(self.aclose(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        self._thread.join()
+        self._thread = None
+        self._loop = None
+
+def feed_from_env(boards):
+    """Start a feed of `boards` if BATTLESHEETS_SPECTATE says to.
+
+    Returns:
+        The running SpectatorFeed, or None.
+
+    """
+    address = os.environ.get('BATTLESHEETS_SPECTATE')
+    if not address:
+        return None
+    host, _, port = address.rpartition(':')
+    feed = SpectatorFeed()
+    for board in boards:
+        feed.watch(board)
+    port = feed.start(host or 'localhost', int(port))
+    print(f"Spectators can watch on port {port}")
+    return feed
+
+async def events(host='localhost', port=8765):
+    """Connect to a feed and yield its Events as they arrive."""
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        magic, width, height = struct.unpack('>4sBB',
+                                             await reader.readexactly(len(HEADER)))
+        if magic != b'BSF1':
+            raise ValueError("That's not a Battlesheets spectator feed")
+        while True:
+            try:
+                data = await reader.readexactly(EVENT.size)
+            except asyncio.IncompleteReadError:
+                return
+            yield decode(data)
+    finally:
+        writer.close()
+
+class BoardView(object):
+    """A board as seen by a watcher, built up from events."""
+    def __init__(self):
+        self.squares = {}   #(x, y): MISS, HIT or SUNK
+
+    def apply(self, event):
+        pos = (event.x, event.y)
+        if event.result == MISS_CODE:
+            self.squares[pos] = MISS
+        else:
+            self.squares[pos] = event.result
+
+    def render(self):
+        """The board as text, like Gameboard.print_hits_and_misses."""
+        lines = ["   A B C D E F G H I J"]
+        for y in range(GAME_HEIGHT):
+            lines.append(f"{y + 1:2}|" + "".join(
+                f"{self.squares.get((x, y), ' ')}|" for x in range(GAME_WIDTH)))
+        return "\n".join(lines)
+
+def play_ai_game(feed, rng, delay=0.0):
+    """Two AIs fight it out on two watched boards."""
+    boards = [Gameboard(), Gameboard()]
+    ais = [AI(rng), AI(rng)]
+    for number, (ai, board) in enumerate(zip(ais, boards)):
+        ai.place_ships(board)
+        feed.watch(board, number)
+    while not any(board.defeated for board in boards):
+        for ai, target in ((ais[0], boards[1]), (ais[1], boards[0])):
+            ai.turn(target)
+            gameclock.sleep(delay)
+            if target.defeated:
+                break
+
+async def bench(watchers, games, seed=None):
+    """Time a feed with `watchers` loopback watchers.
+
+    Every game is played on boards 0 and 1, so watchers see one long game.
+
+    """
+    feed = SpectatorFeed(max_backlog=1 << 20)
+    port = await feed.serve()
+    received = [0] * watchers
+
+    async def watcher(i):
+        async for _ in events(port=port):
+            received[i] += 1
+
+    tasks = [asyncio.create_task(watcher(i)) for i in range(watchers)]
+    while len(feed.watchers) < watchers:
+        await asyncio.sleep(0.01)
+
+    rng = random.Random(seed)
+    loop = asyncio.get_running_loop()
+    start = time.perf_counter()
+    for _ in range(games):
+        #the games run on another thread, like a real one would
+        await loop.run_in_executor(None, play_ai_game, feed, rng)
+    sent = (len(feed.history) - len(HEADER)) // EVENT.size
+    while min(received) < sent:
+        await asyncio.sleep(0.01)
+    seconds = time.perf_counter() - start
+    await feed.aclose()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    print(f"{sent:,} events to {watchers:,} watchers in {seconds:.2f}s, "
+          f"{feed.dropped} dropped")
+    print(f"fan-out: {feed.fan_out_seconds / sent * 1e6:.1f} us per event, "
+          f"{feed.fan_out_seconds / sent / watchers * 1e9:.1f} ns per watcher "
+          f"per event")
+
+async def watch(host, port):
+    views = collections.defaultdict(BoardView)
+    async for event in events(host, port):
+        views[event.board].apply(event)
+        gameclock.clear_screen()
+        for number in sorted(views):
+            print(f"Board {number + 1}")
+            print(views[number].render())
+
+def main():
+    parser = argparse.ArgumentParser(description="Battlesheets for spectators.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    serve = commands.add_parser('serve', help="stream AI against AI games")
+    serve.add_argument('--host', default='localhost')
+    serve.add_argument('--port', type=int, default=8765)
+    serve.add_argument('--delay', type=float, default=0.5,
+                       help="seconds between shots")
+    look = commands.add_parser('watch', help="watch a feed")
+    look.add_argument('--host', default='localhost')
+    look.add_argument('--port', type=int, default=8765)
+    timing = commands.add_parser('bench', help="time a feed over loopback")
+    timing.add_argument('--watchers', type=int, default=1000)
+    timing.add_argument('--games', type=int, default=10)
+    timing.add_argument('--seed', type=int)
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        feed = SpectatorFeed()
+        port = feed.start(args.host, args.port)
+        print(f"Streaming on port {port}, Ctrl-C to stop")
+        try:
+            play_ai_game(feed, random, args.delay)
+            print("Game over, still serving the replay")
+            while True:
+                time.sleep(60)
+        except KeyboardInterrupt:
+            pass
+        feed.close()
+    elif args.command == 'watch':
+        try:
+            asyncio.run(watch(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+    else:
+        asyncio.run(bench(args.watchers, args.games, args.seed))
+
+if __name__ == '__main__':
+    main()
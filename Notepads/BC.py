@@ -1,39 +1,267 @@
 # my first notepad commit!!!
 """
 My first class assignment about classes
+
+Grew up into a badminton match engine.  Each rally is played shot by
+shot: whether a shot comes back depends on the player's accuracy, how
+tired they are and how hard the last shot was, and every shot wears
+their stamina down a little.  Scoring is rally point to 21 (win by 2,
+capped at 30), best of three sets.
+
+    python -m Notepads.BC                    watch a match
+    python -m Notepads.BC --batch 100000     play lots of matches, no waiting
 """
+import argparse
+import concurrent.futures
 import random
 import time
 
+import gameclock
+
+POINTS_TO_WIN = 21
+POINTS_CAP = 30
+SETS_TO_WIN = 2
+
 class BadmintonPlayer():
     # creates player and holds stats and moves
 
-    def __init__(self):
-        self.player_name = ""
+    def __init__(self, player_name="", accuracy=0.9, power=0.5, stamina=10,
+                 fatigue=0.05, recovery=0.3):
+        #a shot that always comes back (or a player who never tires) would
+        #make a rally that never ends
+        if not 0 < accuracy <= 1:
+            raise ValueError(f"accuracy must be in (0, 1], not {accuracy}")
+        if power < 0:
+            raise ValueError(f"power can't be negative, not {power}")
+        if fatigue <= 0:
+            raise ValueError(f"fatigue must be more than 0, not {fatigue}")
+        self.player_name = player_name
         self.player_age = ""
         self.player_category= ""
-        self.stamina = 10
+        #how likely a shot is to come back, before tiredness and pressure
+        self.accuracy = accuracy
+        #how hard the player hits, which makes the opponent's shot harder
+        self.power = power
+        self.max_stamina = stamina
+        self.stamina = stamina
+        #stamina used per shot, and won back between rallies
+        self.fatigue = fatigue
+        self.recovery = recovery
 
     def __str__(self):
         return("---\n"+
-                f"{self.name}\'s stats are:\n"+
-                f"Stamina:{self.stamina}\n"+
+                f"{self.player_name}\'s stats are:\n"+
+                f"Stamina:{self.stamina:.1f}\n"+
                 "---"
                 )
 
-    def badminton_hit():
-        damage =
+    def badminton_hit(self, pressure, rng=random):
+        """Try to return a shot.
+
+        Args:
+            pressure (Float): How hard the incoming shot is, 0 to 1.
+            rng: Source of randomness, random.Random or alike.
+
+        Returns:
+            The pressure of the return shot, or None if it didn't come back.
+
+        """
+        stamina = self.stamina
+        fresh = stamina / self.max_stamina
+        if rng.random() >= self.accuracy * (0.5 + 0.5 * fresh) * (1 - 0.5 * pressure):
+            return None
+        shot = self.power * fresh * rng.random()
+        #hard shots and hard returns both take it out of you
+        stamina -= self.fatigue * (1 + pressure + shot)
+        self.stamina = stamina if stamina > 0 else 0.0
+        return shot
+
+    def rest(self, amount):
+        stamina = self.stamina + amount
+        self.stamina = stamina if stamina < self.max_stamina else self.max_stamina
 
     def screenprint(self):
-        this_string = "placeholder"
+        this_string = f"{self.player_name}: stamina {self.stamina:.1f}"
         print(this_string)
 
+def play_rally(server, receiver, rng=random):
+    """Play one rally.
+
+    Returns:
+        (the player who won it, how many shots were played)
+
+    """
+    players = (server, receiver)
+    #a serve is an easy shot to return
+    pressure = 0.0
+    shots = 0
+    while True:
+        hitter = players[shots % 2]
+        pressure = hitter.badminton_hit(pressure, rng)
+        if pressure is None:
+            return players[(shots + 1) % 2], shots
+        shots += 1
+
+def set_over(a, b):
+    """Has a set finished with these scores?"""
+    return max(a, b) >= POINTS_CAP \
+        or (max(a, b) >= POINTS_TO_WIN and abs(a - b) >= 2)
+
+class MatchResult(object):
+    """How a match went.
+
+    Attributes:
+        winner (BadmintonPlayer): Who won.
+        sets (list): (player 1 points, player 2 points) for each set.
+        rallies (list): The number of shots in each rally.
+
+    """
+    def __init__(self, winner, sets, rallies):
+        self.winner = winner
+        self.sets = sets
+        self.rallies = rallies
+
+    @property
+    def longest_rally(self):
+        return max(self.rallies)
+
+    @property
+    def mean_rally(self):
+        return sum(self.rallies) / len(self.rallies)
+
+def play_match(player1, player2, rng=random, on_rally=None):
+    """Play a match between two players.
+
+    Args:
+        player1, player2 (BadmintonPlayer): Both start fully rested.
+        rng: Source of randomness, random.Random or alike.
+        on_rally: If given, called after every rally as
+            on_rally(winner, shots, score, sets) so the match can be shown.
+
+    Returns:
+        A MatchResult.
+
+    """
+    player1.stamina = player1.max_stamina
+    player2.stamina = player2.max_stamina
+    sets = []
+    sets_won = {player1: 0, player2: 0}
+    rallies = []
+    server = player1
+    while max(sets_won.values()) < SETS_TO_WIN:
+        score = {player1: 0, player2: 0}
+        while not set_over(score[player1], score[player2]):
+            receiver = player2 if server is player1 else player1
+            winner, shots = play_rally(server, receiver, rng)
+            rallies.append(shots)
+            score[winner] += 1
+            #the winner of a rally serves the next one
+            server = winner
+            player1.rest(player1.recovery)
+            player2.rest(player2.recovery)
+            if on_rally:
+                on_rally(winner, shots, score, sets)
+        sets.append((score[player1], score[player2]))
+        sets_won[player1 if score[player1] > score[player2] else player2] += 1
+        #a break between sets
+        player1.rest(player1.max_stamina / 2)
+        player2.rest(player2.max_stamina / 2)
+    winner = player1 if sets_won[player1] > sets_won[player2] else player2
+    return MatchResult(winner, sets, rallies)
+
+def _play_batch(matches, player1_stats, player2_stats, seed):
+    """Play `matches` matches and return the summed up numbers."""
+    rng = random.Random(seed)
+    player1 = BadmintonPlayer("Player 1", **player1_stats)
+    player2 = BadmintonPlayer("Player 2", **player2_stats)
+    wins = rallies = shots = longest = 0
+    for _ in range(matches):
+        result = play_match(player1, player2, rng)
+        wins += result.winner is player1
+        rallies += len(result.rallies)
+        shots += sum(result.rallies)
+        longest = max(longest, result.longest_rally)
+    return wins, rallies, shots, longest
+
+def simulate(matches, player1_stats=None, player2_stats=None, seed=None,
+             workers=1):
+    """Play a batch of matches without any pauses.
+
+    Args:
+        matches (Int): How many matches to play.
+        player1_stats, player2_stats (dict): Keyword arguments for each
+            BadmintonPlayer, e.g. {'accuracy': 0.92, 'power': 0.6}.
+        seed (Int): Seed for a repeatable batch.
+        workers (Int): Split the batch over this many processes.
+
+    Returns:
+        A dict of the batch's statistics.
+
+    """
+    player1_stats = player1_stats or {}
+    player2_stats = player2_stats or {}
+    seeds = random.Random(seed).sample(range(2**32), workers)
+    chunks = [matches // workers + (i < matches % workers) for i in range(workers)]
+    start = time.perf_counter()
+    if workers == 1:
+        totals = [_play_batch(matches, player1_stats, player2_stats, seeds[0])]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+            totals = list(pool.map(_play_batch, chunks,
+                                   [player1_stats] * workers,
+                                   [player2_stats] * workers, seeds))
+    seconds = time.perf_counter() - start
+    wins = sum(t[0] for t in totals)
+    rallies = sum(t[1] for t in totals)
+    shots = sum(t[2] for t in totals)
+    longest = max(t[3] for t in totals)
+    return {'matches': matches,
+            'player1_win_rate': wins / matches,
+            'rallies_per_match': rallies / matches,
+            'shots_per_rally': shots / rallies,
+            'longest_rally': longest,
+            'seconds': seconds,
+            'matches_per_second': matches / seconds}
+
+def watch_match(player1, player2):
+    """Play a match at watching speed."""
+    def show(winner, shots, score, sets):
+        print(f"{shots} shot rally, point to {winner.player_name}!  "
+              f"{score[player1]} - {score[player2]}")
+        gameclock.sleep(2)
+    print(f"{player1.player_name} serves!")
+    result = play_match(player1, player2, on_rally=show)
+    print(f"{result.winner.player_name} wins "
+          + ", ".join(f"{a}-{b}" for a, b in result.sets))
+    print(player1)
+    print(player2)
 
+def main():
+    parser = argparse.ArgumentParser(description="Badminton match engine.")
+    parser.add_argument('--batch', type=int, metavar='MATCHES',
+                        help="play this many matches as fast as possible")
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--seed', type=int)
+    parser.add_argument('--p1', nargs=2, type=float, metavar=('ACCURACY', 'POWER'),
+                        default=(0.9, 0.5))
+    parser.add_argument('--p2', nargs=2, type=float, metavar=('ACCURACY', 'POWER'),
+                        default=(0.9, 0.5))
+    args = parser.parse_args()
 
-Player1 = BadmintonPlayer()
-Player2 = BadmintonPlayer()
+    p1 = {'accuracy': args.p1[0], 'power': args.p1[1]}
+    p2 = {'accuracy': args.p2[0], 'power': args.p2[1]}
+    try:
+        player1 = BadmintonPlayer("Player 1", **p1)
+        player2 = BadmintonPlayer("Player 2", **p2)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.batch:
+        stats = simulate(args.batch, p1, p2, args.seed, args.workers)
+        for key, value in stats.items():
+            print(f"{key:>20}: {value:,.3f}" if isinstance(value, float)
+                  else f"{key:>20}: {value:,}")
+    else:
+        watch_match(player1, player2)
 
-while match_points < 5:
-    print(f"{Player1.name} serves!")
-    print(f"{Player2.name} serves!")
-    time.sleep(2)
+if __name__ == '__main__':
+    main()
@@ -1,24 +1,100 @@
 #Dan's classy class example!! Ho, ho, ho!
 
 import random as r
-import time
 
-class Troll:
+import gameclock
+from .entities import EntityStore, TROLL, HERO
+
+#All the attack methods take an optional rng, anything with the random()
+#and randint() methods of random.Random.  By default they use the global
+#generator; pass a seeded one (see rngstreams.py) to replay a fight.
+
+#Every Troll and Hero keeps its stats in a store, see entities.py.
+#Unless told otherwise they all share one, made when it's first needed
+#so that importing this file doesn't build anything.
+_world = None
+
+def default_store():
+    """The store Trolls and Heroes use when they aren't given one."""
+    global _world
+    if _world is None:
+        _world = EntityStore()
+    return _world
+
+def __getattr__(name):
+    #DM.world is still there, it just isn't made until someone asks
+    if name == 'world':
+        return default_store()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def _number(value):
+    #whole numbers as ints, so a fresh Troll has "Health: 20" not 20.0
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+class _Stat(object):
+    """A stat kept in this entity's row of the store.
+
+    Read on the class itself it's the class variable named by `default`,
+    the value new entities start with (see _Stats for setting it).
+
+    """
+    def __init__(self, name, type=_number, default=None):
+        self.name = name
+        self.type = type
+        self.default = default
+
+    def __get__(self, obj, owner=None):
+        if obj is None:
+            return getattr(owner, self.default) if self.default else self
+        return self.type(getattr(obj.store, self.name)[obj.id])
+
+    def __set__(self, obj, value):
+        if self.name == 'health':
+            obj.store.set_health(obj.id, value)
+        else:
+            getattr(obj.store, self.name)[obj.id] = value
+
+class _Stats(type):
+    """Makes Troll.attack_strength = 7 set the value new trolls start with.
+
+    That's what it did when attack_strength was a plain class variable;
+    without this it would replace the _Stat.
+
+    """
+    def __setattr__(cls, name, value):
+        for klass in cls.__mro__:
+            if name in klass.__dict__:
+                stat = klass.__dict__[name]
+                if isinstance(stat, _Stat) and stat.default:
+                    name = stat.default
+                break
+        super().__setattr__(name, value)
+
+class Troll(metaclass=_Stats):
     '''
         Lives under a bridge, terrorises goats
         and writes nasty comments on social media.
     '''
-    #class variable
-    attack_strength = 5
+    #class variables, the stats every new troll starts with.
+    #Troll.attack_strength reads and sets base_attack_strength too.
+    base_attack_strength = 5
+    hit_chance = 0.8
+    max_health = 20
 
-    def __init__(self):
-        self.health = 20
+    #each troll's own stats live in the store
+    health = _Stat('health')
+    attack_strength = _Stat('attack_strength', default='base_attack_strength')
 
-    def attack(self, opponent):
+    def __init__(self, store=None):
+        self.store = store if store is not None else default_store()
+        self.id = self.store.add(TROLL, Troll.max_health, Troll.base_attack_strength)
+
+    def attack(self, opponent, rng=r):
         #Trolls are somewhat uncoordinated and only have a 80% chance of
         #landing a blow
-        if r.random() < 0.8:
-            opponent.health -= r.randint(5,15)/10.0 * Troll.attack_strength
+        if rng.random() < self.hit_chance:
+            opponent.health -= rng.randint(5,15)/10.0 * self.attack_strength
             return True
         else : return False
 
@@ -26,11 +102,15 @@ class Hero:
     '''
         Player character.
     '''
-    def __init__(self):
-        self.attack_strength = 10
-        self.super_attack_strength = 15
-        self.health = 35
-        self.super_attacks_left = 2
+    health = _Stat('health')
+    attack_strength = _Stat('attack_strength')
+    super_attack_strength = _Stat('super_attack_strength')
+    super_attacks_left = _Stat('super_attacks_left', int)
+
+    def __init__(self, store=None):
+        self.store = store if store is not None else default_store()
+        self.id = self.store.add(HERO, health=35, attack_strength=10,
+                                 super_attack_strength=15, super_attacks_left=2)
 
     def __str__(self):
         return ("******\n"+
@@ -39,73 +119,76 @@ class Hero:
                f"Num of special attacks left: {self.super_attacks_left}\n"+
                "******\n")
 
-    def attack(self, opponent):
-            opponent.health -= r.randint(5,15)/10.0 * self.attack_strength
+    def attack(self, opponent, rng=r):
+            opponent.health -= rng.randint(5,15)/10.0 * self.attack_strength
 
-    def super_attack(self, opponent):
+    def super_attack(self, opponent, rng=r):
         if self.super_attacks_left > 0:
-            opponent.health -= r.randint(5,15)/10.0 * self.super_attack_strength
+            opponent.health -= rng.randint(5,15)/10.0 * self.super_attack_strength
             self.super_attacks_left -= 1
 
 #game logic start
-
-bad_guys = []
-bad_guys.append(Troll())
-bad_guys.append(Troll())
-bad_guys.append(Troll())
-dan_mudie = Hero()
-print(dan_mudie)
-input("This is you.\nHit Enter to continue...")
-print("You tread cautiously into the wood,"+
-      " when all of a sudden...")
-time.sleep(3)
-print("...three trolls appear!\n")
-time.sleep(2)
-
-#Game-ish loop
-while dan_mudie.health > 0 and len([t for t in bad_guys if t.health > 0]):
-
-    #print trolls
-    print("Troll 1       Troll 2       Troll 3")
-    for i, troll in enumerate(bad_guys):
-        if troll.health > 0 : print(f"Health: {troll.health}".ljust(14), end = '')
-        else : print("DEAD".ljust(14), end='')
-    print()
-    time.sleep(2)
-
-    #one troll attacks
-    for t in [t for t in bad_guys if t.health > 0]:
+def main():
+    store = EntityStore()
+    bad_guys = []
+    bad_guys.append(Troll(store))
+    bad_guys.append(Troll(store))
+    bad_guys.append(Troll(store))
+    trolls_by_id = {t.id: t for t in bad_guys}
+    dan_mudie = Hero(store)
+    print(dan_mudie)
+    gameclock.ask("This is you.\nHit Enter to continue...")
+    print("You tread cautiously into the wood,"+
+          " when all of a sudden...")
+    gameclock.sleep(3)
+    print("...three trolls appear!\n")
+    gameclock.sleep(2)
+
+    #Game-ish loop
+    while dan_mudie.health > 0 and store.count_alive(TROLL):
+
+        #print trolls
+        print("Troll 1       Troll 2       Troll 3")
+        for i, troll in enumerate(bad_guys):
+            if troll.health > 0 : print(f"Health: {troll.health}".ljust(14), end = '')
+            else : print("DEAD".ljust(14), end='')
+        print()
+        gameclock.sleep(2)
+
+        #one troll attacks
+        t = trolls_by_id[store.first_alive(TROLL)]
         print("\nA troll attacks!")
-        time.sleep(2)
+        gameclock.sleep(2)
         if t.attack(dan_mudie) : print("You've been hit!\n")
         else : print("The troll misses...and clumsily falls over." +
                      "  Awwww, isn't he cute!")
+        gameclock.sleep(2)
+        if dan_mudie.health < 1: break
+        print(dan_mudie)
+        gameclock.ask("Hit Enter to continue...")
+
+        #Hero attacks...fyi, there is no input validation #thuglife
+        troll_to_attack = int(gameclock.ask("Who will you attack (1,2,3): "))
+        attack_mode = gameclock.ask("What will you do? (a = attack, sa = super attack): ")
+
+        if attack_mode == 'a':
+            dan_mudie.attack(bad_guys[troll_to_attack-1])
+        elif attack_mode == 'sa':
+            dan_mudie.super_attack(bad_guys[troll_to_attack-1])
+
+        print(dan_mudie)
+
+    #either hero is dead or all the trolls are dead
+    if dan_mudie.health < 1:
+        print("You've been killed!\n"
+              "Who'll take the ring to Alderan now???")
+        return
+    #if hero isn't dead, the trolls must be dead
+    print("Troll 1       Troll 2       Troll 3")
+    for i, troll in enumerate(bad_guys):
+        if troll.health > 0 : print(f"Health: {troll.health}".ljust(14), end = '')
+        else : print("DEAD".ljust(14), end='')
+    print("You are victorious!!!")
 
-        break
-    time.sleep(2)
-    if dan_mudie.health < 1: break
-    print(dan_mudie)
-    input("Hit Enter to continue...")
-
-    #Hero attacks...fyi, there is no input validation #thuglife
-    troll_to_attack = int(input("Who will you attack (1,2,3): "))
-    attack_mode = input("What will you do? (a = attack, sa = super attack): ")
-
-    if attack_mode == 'a':
-        dan_mudie.attack(bad_guys[troll_to_attack-1])
-    elif attack_mode == 'sa':
-        dan_mudie.super_attack(bad_guys[troll_to_attack-1])
-
-    print(dan_mudie)
-
-#either hero is dead or all the trolls are dead
-if dan_mudie.health < 1:
-    print("You've been killed!\n"
-          "Who'll take the ring to Alderan now???")
-    quit()
-#if hero isn't dead, the trolls must be dead
-print("Troll 1       Troll 2       Troll 3")
-for i, troll in enumerate(bad_guys):
-    if troll.health > 0 : print(f"Health: {troll.health}".ljust(14), end = '')
-    else : print("DEAD".ljust(14), end='')
-print("You are victorious!!!")
+if __name__ == '__main__':
+    main()
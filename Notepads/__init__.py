@@ -0,0 +1,36 @@
+"""The troll fight, the badminton match and friends.
+
+Run them from the top of the repository, e.g. python -m Notepads DM, see
+__main__.py for the list.
+
+Importing the package doesn't import the games; the names below are
+looked up the first time they're used, so
+
+    from Notepads import BadmintonPlayer
+
+only loads BC.py, and a bare import Notepads loads nothing.
+"""
+
+import importlib
+
+#name: module it lives in
+_LAZY = {
+    'BadmintonPlayer': 'BC',
+    'play_match': 'BC',
+    'EntityStore': 'entities',
+    'Hero': 'DM',
+    'Troll': 'DM',
+    'PolicySolver': 'troll_policy',
+}
+
+__all__ = sorted(_LAZY)
+
+def __getattr__(name):
+    if name not in _LAZY:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module('.' + _LAZY[name], __name__), name)
+    globals()[name] = value #so it's only looked up once
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(_LAZY))
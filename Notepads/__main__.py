@@ -0,0 +1,29 @@
+"""python -m Notepads GAME [options]
+
+    DM              the troll fight
+    BC              the badminton match, --batch to simulate a lot of them
+    troll_sim       simulate troll fights with different tactics
+    troll_policy    work out the best way to fight the trolls
+
+Anything after GAME is passed on to it, e.g.
+
+    python -m Notepads BC --batch 10000
+"""
+
+import importlib
+import sys
+
+GAMES = ('DM', 'BC', 'troll_sim', 'troll_policy')
+
+def main(argv=None):
+    args = list(sys.argv[1:] if argv is None else argv)
+    if not args or args[0] not in GAMES:
+        sys.exit(__doc__.rstrip())
+    name = args.pop(0)
+    #the game parses its own options and names itself in --help
+    sys.argv = [f"python -m {__package__} {name}"] + args
+    #only the chosen game is imported
+    importlib.import_module('.' + name, __package__).main()
+
+if __name__ == '__main__':
+    main()
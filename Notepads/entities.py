@@ -0,0 +1,219 @@
+"""Struct-of-arrays storage for combatants.
+
+Instead of every Troll and Hero keeping its own attributes, all their
+numbers live in one EntityStore, a column per stat:
+
+    store.health[id]            store.attack_strength[id]
+    store.kind[id]              store.super_attack_strength[id]
+    store.status[id]            store.super_attacks_left[id]
+
+`id` is just the row number.  Because a column is one contiguous NumPy
+array, a round involving thousands of combatants is a few array
+operations rather than a Python loop over objects.
+
+The store also keeps, for each kind, the set of ids that are still
+alive (health above 0) as a packed array plus a position lookup.  Adding
+and removing ids, counting them and checking one are all O(1), alive()
+hands back the packed array without building a new list, and a head
+pointer makes first_alive() O(1) amortised.
+
+NumPy is only loaded when the first store is made (see lazyimport.py),
+so importing this module, or DM.py, is quick.
+"""
+
+import lazyimport
+
+np = lazyimport.lazy_import('numpy')
+
+#kinds of entity
+TROLL = 0
+HERO = 1
+
+#status values
+DEAD = 0
+ALIVE = 1
+
+class AliveSet(object):
+    """A set of ids, packed into an array.
+
+    Removal swaps the last id into the hole, so the order of alive() is
+    not the order ids were added in.
+
+    """
+    def __init__(self, capacity):
+        self._ids = np.empty(capacity, dtype=np.int64)
+        self._pos = np.full(capacity, -1, dtype=np.int64) #id: index in _ids
+        self._n = 0
+        self._head = 0 #no id below this is in the set
+
+    def _grow(self, capacity):
+        ids = np.empty(capacity, dtype=np.int64)
+        ids[:self._n] = self._ids[:self._n]
+        pos = np.full(capacity, -1, dtype=np.int64)
+        pos[:len(self._pos)] = self._pos
+        self._ids, self._pos = ids, pos
+
+    def __len__(self):
+        return self._n
+
+    def __contains__(self, id):
+        return id < len(self._pos) and self._pos[id] >= 0
+
+    def add(self, id):
+        if id >= len(self._pos) or self._n == len(self._ids):
+            self._grow(max(2 * len(self._pos), id + 1))
+        if self._pos[id] >= 0:
+            return
+        self._ids[self._n] = id
+        self._pos[id] = self._n
+        self._n += 1
+        self._head = min(self._head, id)
+
+    def remove(self, id):
+        i = self._pos[id]
+        if i < 0:
+            return
+        last = self._ids[self._n - 1]
+        self._ids[i] = last
+        self._pos[last] = i
+        self._pos[id] = -1
+        self._n -= 1
+
+    def first(self):
+        """The lowest id in the set, or None.
+
+        The head only moves forward past removed ids, so this is O(1)
+        amortised over a fight; it only goes back when an id below it is
+        added again.
+
+        """
+        pos = self._pos
+        head = self._head
+        while head < len(pos) and pos[head] < 0:
+            head += 1
+        self._head = head
+        return head if head < len(pos) else None
+
+    def ids(self):
+        """The ids in the set, as a read-only view."""
+        view = self._ids[:self._n]
+        view.flags.writeable = False
+        return view
+
+class EntityStore(object):
+    """Stats for many combatants, kept in parallel arrays.
+
+    Args:
+        capacity (Int): How many entities to make room for up front.  The
+            arrays grow as needed.
+
+    """
+    #dtypes by name, so NumPy isn't needed until a store is made
+    COLUMNS = (('kind', 'int8'), ('status', 'int8'),
+               ('health', 'float64'), ('attack_strength', 'float64'),
+               ('super_attack_strength', 'float64'),
+               ('super_attacks_left', 'int32'))
+
+    def __init__(self, capacity=16):
+        self.size = 0
+        for name, dtype in self.COLUMNS:
+            setattr(self, name, np.zeros(capacity, dtype=dtype))
+        self._alive = {TROLL: AliveSet(capacity), HERO: AliveSet(capacity)}
+
+    def __len__(self):
+        return self.size
+
+    def _grow(self, capacity):
+        for name, dtype in self.COLUMNS:
+            column = np.zeros(capacity, dtype=dtype)
+            column[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, column)
+
+    def add(self, kind, health, attack_strength, super_attack_strength=0,
+            super_attacks_left=0):
+        """Add an entity and return its id."""
+        return self.add_many(kind, 1, health, attack_strength,
+                             super_attack_strength, super_attacks_left)[0]
+
+    def add_many(self, kind, count, health, attack_strength,
+                 super_attack_strength=0, super_attacks_left=0):
+        """Add `count` identical entities and return their ids."""
+        if self.size + count > len(self.health):
+            self._grow(max(2 * len(self.health), self.size + count))
+        ids = np.arange(self.size, self.size + count)
+        self.size += count
+        self.kind[ids] = kind
+        self.health[ids] = health
+        self.attack_strength[ids] = attack_strength
+        self.super_attack_strength[ids] = super_attack_strength
+        self.super_attacks_left[ids] = super_attacks_left
+        self.status[ids] = DEAD
+        self._update_status(ids)
+        return ids
+
+    def _update_status(self, ids):
+        """Bring status and the alive sets into line with health."""
+        ids = np.unique(ids)
+        alive = self.health[ids] > 0
+        changed = ids[alive != (self.status[ids] == ALIVE)]
+        for id in changed.tolist():
+            if self.health[id] > 0:
+                self.status[id] = ALIVE
+                self._alive[self.kind[id]].add(id)
+            else:
+                self.status[id] = DEAD
+                self._alive[self.kind[id]].remove(id)
+
+    def set_health(self, id, value):
+        self.health[id] = value
+        self._update_status(np.array([id]))
+
+    def damage(self, ids, amounts):
+        """Take `amounts` off the health of `ids`, all at once.
+
+        `ids` may repeat, in which case the damage adds up.
+
+        """
+        ids = np.asarray(ids)
+        np.subtract.at(self.health, ids, amounts)
+        self._update_status(ids)
+
+    def is_alive(self, id):
+        return self.status[id] == ALIVE
+
+    def alive(self, kind):
+        """The ids of every living entity of `kind`, in no particular order."""
+        return self._alive[kind].ids()
+
+    def count_alive(self, kind):
+        return len(self._alive[kind])
+
+    def first_alive(self, kind):
+        """The lowest living id of `kind`, or None."""
+        return self._alive[kind].first()
+
+    def attack(self, attackers, targets, rng, hit_chance=1.0, super_attack=False):
+        """Resolve a batch of attacks.
+
+        Each attacker hits its target with probability `hit_chance`, for
+        randint(5,15)/10 times its attack strength (or super attack
+        strength), the same damage roll the game uses.
+
+        Args:
+            attackers, targets (numpy int arrays): Who attacks whom.
+            rng (numpy.random.Generator): Source of the dice rolls.
+            hit_chance (Float): The chance of each attack landing.
+            super_attack (Bool): Use super attack strength.
+
+        Returns:
+            A bool array, True where the attack landed.
+
+        """
+        attackers = np.asarray(attackers)
+        n = len(attackers)
+        hits = rng.random(n) < hit_chance if hit_chance < 1 else np.ones(n, bool)
+        strength = (self.super_attack_strength if super_attack
+                    else self.attack_strength)[attackers]
+        rolls = rng.integers(5, 16, size=n) / 10.0
+        self.damage(np.asarray(targets)[hits], (rolls * strength)[hits])
+        return hits
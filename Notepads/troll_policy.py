@@ -0,0 +1,308 @@
+"""Work out the best way to play the troll encounter in DM.py.
+
+Rather than trying strategies out like troll_sim.py does, this solves
+the fight exactly with dynamic programming.  Every health in the game is
+a multiple of half a point, so a state is
+
+    (hero health, super attacks left, troll healths)
+
+counted in half points.  The trolls are identical apart from their
+health, so the troll healths are kept sorted, which cuts the number of
+states by up to 6x for three trolls.
+
+For one (super attacks left, troll healths) pair the win chance is a
+vector over every hero health at once, so most of the work is NumPy
+operations on short arrays.  Those vectors are memoised, and each one
+only depends on states with less troll health left, so the recursion
+always finishes.
+
+A round goes like DM.py: a troll attacks, then the hero attacks or super
+attacks one live troll.  The policy table says which, for every state:
+
+    python -m Notepads.troll_policy                  # solve, print a summary
+    python -m Notepads.troll_policy --table out.csv  # write the policy table
+    python -m Notepads.troll_policy --attack 12      # a harder hitting hero
+    python -m Notepads.troll_policy --check 100000   # play the policy to check it
+"""
+
+import argparse
+import csv
+import random
+import time
+
+import numpy as np
+
+from .DM import Troll, Hero
+from .entities import EntityStore
+
+#damage is randint(5,15)/10.0 * strength in DM.py
+ROLLS = [k / 10.0 for k in range(5, 16)]
+
+class PolicySolver(object):
+    """Solves one version of the encounter.
+
+    Every argument defaults to the value DM.py uses.  Make a new solver
+    to re-solve after changing any of them; it builds its memo from
+    scratch.
+
+    Args:
+        trolls (Int): How many trolls there are.
+        troll_health (Float): Each troll's starting health.
+        troll_attack (Float): Troll attack strength.
+        hit_chance (Float): Chance of a troll attack landing.
+        hero_health (Float): The hero's starting health.
+        hero_attack (Float), hero_super (Float): Hero attack strengths.
+        supers (Int): Super attacks the hero starts with.
+        unit (Float): The size of one step of health.  Damage that isn't
+            a multiple of it is rounded to the nearest step.
+
+    """
+    def __init__(self, trolls=3, troll_health=None, troll_attack=None,
+                 hit_chance=None, hero_health=None, hero_attack=None,
+                 hero_super=None, supers=None, unit=0.5):
+        hero = Hero(EntityStore(1))
+        self.trolls = trolls
+        self.unit = unit
+        self.hit_chance = Troll.hit_chance if hit_chance is None else hit_chance
+        #the stats as given, for play() to build the fighters from
+        self.stats = {
+            'troll_health': Troll.max_health if troll_health is None else troll_health,
+            'troll_attack': (Troll.base_attack_strength if troll_attack is None
+                             else troll_attack),
+            'hero_health': hero.health if hero_health is None else hero_health,
+            'hero_attack': hero.attack_strength if hero_attack is None else hero_attack,
+            'hero_super': (hero.super_attack_strength if hero_super is None
+                           else hero_super)}
+        self.troll_health = self._units(self.stats['troll_health'])
+        self.hero_health = self._units(self.stats['hero_health'])
+        self.supers = hero.super_attacks_left if supers is None else supers
+        troll_attack = self.stats['troll_attack']
+        hero_attack = self.stats['hero_attack']
+        hero_super = self.stats['hero_super']
+
+        self.troll_damage = [self._units(r * troll_attack) for r in ROLLS]
+        self.hero_damage = {False: [self._units(r * hero_attack) for r in ROLLS],
+                            True: [self._units(r * hero_super) for r in ROLLS]}
+        #the hero is dead below 1 point of health
+        self.death = self._units(1)
+
+        self._values = {} #(supers left, troll healths): win chance per hero health
+        self._policy = {} #(supers left, troll healths): (actions, best per hero health)
+
+    def _units(self, health):
+        return int(round(health / self.unit))
+
+    @property
+    def start(self):
+        """The state at the start of the fight, minus the hero's health."""
+        return self.supers, (self.troll_health,) * self.trolls
+
+    def value(self, supers, trolls):
+        """Chance of winning from the start of a round.
+
+        Args:
+            supers (Int): Super attacks left.
+            trolls (tuple): Troll healths in units, sorted.
+
+        Returns:
+            A numpy array, indexed by hero health in units.
+
+        """
+        key = (supers, trolls)
+        if key in self._values:
+            return self._values[key]
+        after_attack = self._best_action(supers, trolls)
+
+        #the troll attacks first: a miss leaves the hero as they were, a
+        #hit moves them down by the damage
+        value = (1 - self.hit_chance) * after_attack
+        p = self.hit_chance / len(self.troll_damage)
+        for d in self.troll_damage:
+            value[d:] += p * after_attack[:len(value) - d]
+        value[:self.death] = 0
+        self._values[key] = value
+        return value
+
+    def _best_action(self, supers, trolls):
+        """Chance of winning once the troll has attacked, playing the best move."""
+        actions = []
+        outcomes = []
+        #trolls on the same health are interchangeable
+        for target in sorted(set(t for t in trolls if t > 0)):
+            i = trolls.index(target)
+            for use_super in ((False, True) if supers else (False,)):
+                results = []
+                for d in self.hero_damage[use_super]:
+                    after = trolls[:i] + (max(0, target - d),) + trolls[i+1:]
+                    if not any(after):
+                        results.append(1.0)
+                    else:
+                        results.append(self.value(supers - use_super,
+                                                  tuple(sorted(after))))
+                actions.append((target, use_super))
+                outcomes.append(sum(results) / len(results)
+                                * np.ones(self.hero_health + 1))
+
+        outcomes = np.array(outcomes)
+        best = outcomes.argmax(axis=0)
+        self._policy[(supers, trolls)] = (actions, best)
+        chance = outcomes.max(axis=0)
+        chance[:self.death] = 0
+        return chance
+
+    def solve(self):
+        """Solve from the starting state and return the hero's win chance."""
+        return float(self.value(*self.start)[self.hero_health])
+
+    def _troll_units(self, health):
+        #a live troll is never rounded down to dead
+        return max(1, self._units(health)) if health > 0 else 0
+
+    def move(self, hero_health, supers, trolls):
+        """The best move from a state, in units.
+
+        States that solve() didn't reach (the damage in a real game isn't
+        always a whole number of units) are solved as they come up.
+
+        Args:
+            hero_health (Int), supers (Int): The hero's state.
+            trolls (tuple of Int): Troll healths, sorted.
+
+        Returns:
+            (health of the troll to attack, True to super attack)
+
+        """
+        if (supers, trolls) not in self._policy:
+            self.value(supers, trolls)
+        actions, best = self._policy[(supers, trolls)]
+        h = min(max(hero_health, 0), self.hero_health)
+        return actions[best[h]]
+
+    def opening_move(self):
+        """The best first move: (health of the troll to attack, True to super attack)."""
+        return self.move(self.hero_health, *self.start)
+
+    def action(self, hero_health, supers, trolls):
+        """The best move.
+
+        Args:
+            hero_health (Float), supers (Int): The hero's state.
+            trolls (list of Float): Every troll's health, dead ones too.
+
+        Returns:
+            (index into `trolls` to attack, True to super attack)
+
+        """
+        target, use_super = self.move(
+            self._units(hero_health), supers,
+            tuple(sorted(self._troll_units(t) for t in trolls)))
+        for i, t in enumerate(trolls):
+            if self._troll_units(t) == target:
+                return i, use_super
+        raise ValueError("No live troll with that health")
+
+    def table(self):
+        """Yield the whole policy, one dict per state, in a stable order.
+
+        Only the (super attacks left, troll healths) pairs that can come up
+        in a game starting from `start` are included, for every hero health
+        the hero could be alive at.
+
+        """
+        for (supers, trolls) in sorted(self._policy):
+            actions, best = self._policy[(supers, trolls)]
+            value = self._values[(supers, trolls)]
+            for h in range(self.death, self.hero_health + 1):
+                target, use_super = actions[best[h]]
+                yield {'hero_health': h * self.unit,
+                       'supers_left': supers,
+                       'trolls': ' '.join(f"{t * self.unit:g}" for t in trolls),
+                       'target_health': target * self.unit,
+                       'attack': 'sa' if use_super else 'a',
+                       'win_chance': round(float(value[h]), 6)}
+
+    def __len__(self):
+        """Number of (super attacks left, troll healths) pairs solved."""
+        return len(self._values)
+
+def fighters(solver, store):
+    """A hero and trolls with the stats `solver` was set up with.
+
+    Returns:
+        (hero, list of trolls)
+
+    """
+    stats = solver.stats
+    trolls = [Troll(store) for _ in range(solver.trolls)]
+    for troll in trolls:
+        troll.health = stats['troll_health']
+        troll.attack_strength = stats['troll_attack']
+        troll.hit_chance = solver.hit_chance
+    hero = Hero(store)
+    hero.health = stats['hero_health']
+    hero.attack_strength = stats['hero_attack']
+    hero.super_attack_strength = stats['hero_super']
+    hero.super_attacks_left = solver.supers
+    return hero, trolls
+
+def play(solver, games, rng=None):
+    """Play `games` fights with the real Troll and Hero following the policy.
+
+    Returns:
+        The fraction won.
+
+    """
+    rng = rng or random.Random()
+    wins = 0
+    for _ in range(games):
+        hero, trolls = fighters(solver, EntityStore())
+        while hero.health > 0 and any(t.health > 0 for t in trolls):
+            next(t for t in trolls if t.health > 0).attack(hero, rng)
+            if hero.health < 1:
+                break
+            i, use_super = solver.action(hero.health, hero.super_attacks_left,
+                                         [t.health for t in trolls])
+            if use_super:
+                hero.super_attack(trolls[i], rng)
+            else:
+                hero.attack(trolls[i], rng)
+        wins += hero.health >= 1
+    return wins / games
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trolls', type=int, default=3)
+    parser.add_argument('--attack', type=float, help="hero attack strength")
+    parser.add_argument('--super', type=float, help="hero super attack strength")
+    parser.add_argument('--troll-attack', type=float, help="troll attack strength")
+    parser.add_argument('--table', metavar='FILE', help="write the policy as CSV")
+    parser.add_argument('--check', type=int, metavar='GAMES',
+                        help="play this many games with the policy")
+    args = parser.parse_args()
+
+    solver = PolicySolver(trolls=args.trolls, hero_attack=args.attack,
+                          hero_super=args.super, troll_attack=args.troll_attack)
+    start = time.perf_counter()
+    win_chance = solver.solve()
+    seconds = time.perf_counter() - start
+    print(f"Best possible win chance: {win_chance:.4%}")
+    print(f"Solved {len(solver):,} troll/super states in {seconds:.2f}s")
+
+    target, use_super = solver.opening_move()
+    print(f"Opening move: {'super attack' if use_super else 'attack'}")
+
+    if args.table:
+        with open(args.table, 'w', newline='') as f:
+            rows = solver.table()
+            first = next(rows)
+            writer = csv.DictWriter(f, fieldnames=list(first))
+            writer.writeheader()
+            writer.writerow(first)
+            writer.writerows(rows)
+        print(f"Policy table written to {args.table}")
+
+    if args.check:
+        print(f"Won {play(solver, args.check):.4%} of {args.check:,} games played")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,204 @@
+"""Monte-Carlo simulator for the troll encounter in DM.py.
+
+Plays the same fight as DM.py, minus the sleeping and typing, for a
+whole batch of games at once.  Each game is a row in a few NumPy arrays
+and every round is a handful of array operations over all the games
+still going, so a million fights take seconds rather than hours.
+
+The rules are the ones in DM.py:
+
+  * each round the first troll still standing attacks the hero, hitting
+    Troll.hit_chance of the time for randint(5,15)/10 * attack_strength
+  * the hero dies once their health drops below 1
+  * the hero then attacks (or super attacks) one troll
+  * the hero wins when every troll's health is 0 or less
+
+A hero strategy is a targeting rule plus a super attack rule:
+
+    target:  'first'     the troll that's attacking, i.e. the first alive
+             'weakest'   the alive troll with the least health
+             'strongest' the alive troll with the most health
+    supers:  'early'     super attack while there are any left
+             'save'      super attack only when a normal attack can't
+                         possibly kill the target
+             'never'     never super attack
+
+    python -m Notepads.troll_sim -n 1000000
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from .DM import Troll, Hero
+from .entities import EntityStore
+
+TARGETS = ('first', 'weakest', 'strongest')
+SUPERS = ('early', 'save', 'never')
+
+def _damage(rng, n, strength):
+    """n draws of randint(5,15)/10.0 * strength, as in DM.py."""
+    return rng.integers(5, 16, size=n) / 10.0 * strength
+
+class SimResult(object):
+    """The outcome of a batch of simulated encounters.
+
+    Attributes:
+        target (Str), supers (Str): The strategy that was played.
+        games (Int): Number of games played.
+        wins (numpy bool array): Whether the hero won each game.
+        rounds (numpy int array): How many rounds each game lasted.
+        hero_health (numpy float array): Hero health at the end of each game.
+        seconds (Float): How long the simulation took.
+
+    """
+    def __init__(self, target, supers, wins, rounds, hero_health, seconds):
+        self.target = target
+        self.supers = supers
+        self.games = len(wins)
+        self.wins = wins
+        self.rounds = rounds
+        self.hero_health = hero_health
+        self.seconds = seconds
+
+    @property
+    def win_rate(self):
+        return float(self.wins.mean())
+
+    def time_to_kill(self, percentiles=(10, 50, 90)):
+        """Percentiles of the rounds needed to kill every troll, in won games."""
+        if not self.wins.any():
+            return {p: None for p in percentiles}
+        values = np.percentile(self.rounds[self.wins], percentiles)
+        return dict(zip(percentiles, values))
+
+    def time_to_kill_counts(self):
+        """Return {rounds: number of wins that took that many rounds}."""
+        counts = np.bincount(self.rounds[self.wins])
+        return {r: int(c) for r, c in enumerate(counts) if c}
+
+    def __str__(self):
+        ttk = self.time_to_kill()
+        if not self.wins.any():
+            return (f"{self.target:>9} {self.supers:>5}  win {0:7.3%}  "
+                    f"({self.games / self.seconds:,.0f} games/s)")
+        return (f"{self.target:>9} {self.supers:>5}  "
+                f"win {self.win_rate:7.3%}  "
+                f"rounds p10/p50/p90 {ttk[10]:.0f}/{ttk[50]:.0f}/{ttk[90]:.0f}  "
+                f"({self.games / self.seconds:,.0f} games/s)")
+
+def simulate(games, target='first', supers='early', trolls=3, rng=None,
+             max_rounds=1000):
+    """Play `games` encounters with one hero strategy.
+
+    Args:
+        games (Int): How many encounters to play.
+        target (Str): The targeting rule, one of TARGETS.
+        supers (Str): The super attack rule, one of SUPERS.
+        trolls (Int): How many trolls appear.
+        rng (numpy.random.Generator): Where the randomness comes from.
+            Defaults to a freshly seeded generator.
+        max_rounds (Int): Games still going after this many rounds are
+            counted as losses.
+
+    Returns:
+        A SimResult.
+
+    """
+    if target not in TARGETS:
+        raise ValueError(f"Unknown target rule {target!r}")
+    if supers not in SUPERS:
+        raise ValueError(f"Unknown super attack rule {supers!r}")
+    rng = rng if rng is not None else np.random.default_rng()
+    start = time.perf_counter()
+
+    hero = Hero(EntityStore(1))
+    wins = np.zeros(games, dtype=bool)
+    rounds = np.zeros(games, dtype=np.int64)
+    final_health = np.zeros(games)
+    #the games still being played, packed together.  `index` maps each
+    #row back to its game, and finished games are dropped each round.
+    index = np.arange(games)
+    health = np.full((games, trolls), float(Troll.max_health))
+    hero_health = np.full(games, float(hero.health))
+    supers_left = np.full(games, hero.super_attacks_left)
+    #the most a normal attack can do
+    max_normal = 1.5 * hero.attack_strength
+
+    for round_no in range(1, max_rounds + 1):
+        n = len(index)
+        if not n:
+            break
+
+        #the first alive troll attacks.  Which one doesn't matter, they
+        #all hit equally hard.
+        hits = rng.random(n) < Troll.hit_chance
+        hero_health -= np.where(hits, _damage(rng, n, Troll.base_attack_strength), 0.0)
+        dead = hero_health < 1
+        if dead.any():
+            rounds[index[dead]] = round_no
+            final_health[index[dead]] = hero_health[dead]
+            keep = ~dead
+            index, health = index[keep], health[keep]
+            hero_health, supers_left = hero_health[keep], supers_left[keep]
+            n = len(index)
+
+        #pick a target
+        alive = health > 0
+        if target == 'first':
+            picked = alive.argmax(axis=1)
+        elif target == 'weakest':
+            picked = np.where(alive, health, np.inf).argmin(axis=1)
+        else:
+            picked = np.where(alive, health, -np.inf).argmax(axis=1)
+        rows = np.arange(n)
+
+        #super attack or not
+        if supers == 'early':
+            use_super = supers_left > 0
+        elif supers == 'save':
+            use_super = (supers_left > 0) & (health[rows, picked] > max_normal)
+        else:
+            use_super = np.zeros(n, dtype=bool)
+        supers_left -= use_super
+        strength = np.where(use_super, hero.super_attack_strength,
+                            hero.attack_strength)
+        health[rows, picked] -= _damage(rng, n, 1.0) * strength
+
+        won = (health <= 0).all(axis=1)
+        if won.any():
+            wins[index[won]] = True
+            rounds[index[won]] = round_no
+            final_health[index[won]] = hero_health[won]
+            keep = ~won
+            index, health = index[keep], health[keep]
+            hero_health, supers_left = hero_health[keep], supers_left[keep]
+
+    #anything left ran out of rounds
+    rounds[index] = max_rounds
+    final_health[index] = hero_health
+
+    return SimResult(target, supers, wins, rounds, final_health,
+                     time.perf_counter() - start)
+
+def simulate_all(games, trolls=3, rng=None):
+    """Run simulate() for every strategy, returning a list of SimResults."""
+    rng = rng if rng is not None else np.random.default_rng()
+    return [simulate(games, t, s, trolls, rng) for t in TARGETS for s in SUPERS]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('-n', '--games', type=int, default=1_000_000)
+    parser.add_argument('--trolls', type=int, default=3)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    print(f"{args.games:,} games per strategy, {args.trolls} trolls")
+    for result in sorted(simulate_all(args.games, args.trolls, rng),
+                         key=lambda r: -r.win_rate):
+        print(result)
+
+if __name__ == '__main__':
+    main()
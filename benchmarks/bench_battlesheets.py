@@ -0,0 +1,111 @@
+"""Hot paths of Battleships/Battlesheets.py."""
+
+import contextlib
+import io
+import random
+
+from Battleships.Battlesheets import (AI, Coord, Gameboard, GAME_WIDTH,
+                                      GAME_HEIGHT, SHIP_LENGTHS)
+from Battleships.shotlog import ShotLog
+from Battleships.solver import PlacementCounter, board_constraints
+
+ALL_SQUARES = [Coord(x, y) for y in range(GAME_HEIGHT) for x in range(GAME_WIDTH)]
+
+#a legal fleet, one ship per row
+FLEET = [(Coord(0, row), ship, 'h') for row, ship in enumerate(SHIP_LENGTHS)]
+
+def fleet_board():
+    board = Gameboard()
+    for pos, ship, orientation in FLEET:
+        board.add_ship(pos=pos, type=ship, orientation=orientation, verbose=False)
+    return board
+
+def half_played_board(seed=7):
+    """A board that has had half its squares fired at."""
+    board = fleet_board()
+    squares = list(ALL_SQUARES)
+    random.Random(seed).shuffle(squares)
+    for pos in squares[:len(squares) // 2]:
+        board.fire(pos)
+    return board
+
+def bench_coord_construct(benchmark):
+    benchmark(lambda: [Coord(x, y) for x in range(GAME_WIDTH)
+                       for y in range(GAME_HEIGHT)])
+
+def bench_coord_hash_lookup(benchmark):
+    points = {c: i for i, c in enumerate(ALL_SQUARES)}
+    probes = [Coord(c[0], c[1]) for c in ALL_SQUARES]
+    benchmark(lambda: [points[c] for c in probes])
+
+def bench_add_ship(benchmark):
+    benchmark(fleet_board)
+
+def bench_fire_every_square(benchmark):
+    def fire_all(board):
+        for pos in ALL_SQUARES:
+            board.fire(pos)
+    benchmark.pedantic(fire_all, setup=lambda: ((fleet_board(),), {}),
+                       rounds=1000)
+
+def bench_fire_every_square_logged(benchmark, tmp_path):
+    """As above, with a ShotLog recording every shot."""
+    def fire_all(board):
+        for pos in ALL_SQUARES:
+            board.fire(pos)
+
+    with ShotLog(str(tmp_path), format='npy') as log:
+        def setup():
+            board = fleet_board()
+            log.watch(board, 'bench')
+            return (board,), {}
+        benchmark.pedantic(fire_all, setup=setup, rounds=1000)
+
+def bench_get_hits_and_misses(benchmark):
+    board = half_played_board()
+    benchmark(board.get_hits_and_misses)
+
+def bench_ai_place_ships(benchmark, rng):
+    ai = AI(rng)
+    benchmark(lambda: ai.place_ships(Gameboard()))
+
+def bench_ai_full_game(benchmark):
+    """AI.turn until every ship is sunk, the same game every round."""
+    def setup():
+        rng = random.Random(11)
+        ai = AI(rng)
+        board = Gameboard()
+        ai.place_ships(board)
+        return (ai, board), {}
+
+    def play(ai, board):
+        for _ in range(GAME_WIDTH * GAME_HEIGHT):
+            ai.turn(board)
+            if board.defeated:
+                return
+
+    benchmark.pedantic(play, setup=setup, rounds=100)
+
+def bench_solver_endgame(benchmark):
+    """An exact count with two ships left, starting from an empty memo."""
+    rng = random.Random(5)
+    ai = AI(rng)
+    board = Gameboard()
+    ai.place_ships(board)
+    while sum(not ship.sunk for ship in board.ships) > 2:
+        ai.turn(board)
+    constraints = board_constraints(board)
+    benchmark.pedantic(lambda counter: counter.count(*constraints),
+                       setup=lambda: ((PlacementCounter(),), {}), rounds=50)
+
+def bench_render_boards(benchmark):
+    board = half_played_board()
+
+    def render():
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            board.print()
+            board.print_hits_and_misses()
+        return out.getvalue()
+
+    benchmark(render)
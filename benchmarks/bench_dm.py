@@ -0,0 +1,23 @@
+"""Hot paths of Notepads/DM.py."""
+
+from Notepads.DM import Troll, Hero, TROLL
+from Notepads.entities import EntityStore
+
+def bench_combat_round(benchmark, rng):
+    """One round of DM.py's loop: the first live troll attacks, the hero hits back."""
+    store = EntityStore()
+    trolls = [Troll(store) for _ in range(3)]
+    by_id = {t.id: t for t in trolls}
+    hero = Hero(store)
+
+    def combat_round():
+        #keep everyone alive so every round does the same work
+        for t in trolls:
+            t.health = Troll.max_health
+        hero.health = 35
+        troll = by_id[store.first_alive(TROLL)]
+        troll.attack(hero, rng)
+        hero.attack(troll, rng)
+        return store.count_alive(TROLL)
+
+    benchmark(combat_round)
@@ -0,0 +1,38 @@
+"""Shared setup for the benchmarks."""
+
+import os
+import random
+import sys
+
+import pytest
+
+#the games are imported as packages from the top of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import gameclock
+
+STORAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.benchmarks')
+
+def pytest_configure(config):
+    #always the folder next to this file, wherever pytest is run from
+    config.option.benchmark_storage = 'file://' + STORAGE
+    #the first run on a machine has nothing to compare against yet, so it
+    #just records; every later run is checked against the last saved one
+    saved = any(name.endswith('.json')
+                for _, _, files in os.walk(STORAGE) for name in files)
+    if not saved:
+        config.option.benchmark_compare = []
+        config.option.benchmark_compare_fail = None
+
+@pytest.fixture(autouse=True)
+def headless():
+    """No pauses, no keyboard and no screen clearing while benchmarking."""
+    console = gameclock.Console(gameclock.InstantClock(),
+                                gameclock.ScriptedInput([]))
+    with gameclock.using(console):
+        yield console
+
+@pytest.fixture
+def rng():
+    """A fixed seed, so every run does exactly the same work."""
+    return random.Random(2018)
@@ -0,0 +1,158 @@
+"""Pacing and keyboard input for the text games.
+
+The games pause for effect (time.sleep) and wait for the player
+(input), which is what you want at the keyboard and exactly what you
+don't in a test or a batch run.  So they go through this module instead:
+
+    gameclock.sleep(2)
+    answer = gameclock.ask("Who will you attack (1,2,3): ")
+    gameclock.clear_screen()
+
+What those do depends on the current Console, which pairs a clock with
+an input provider:
+
+    RealTimeClock       sleeps for real (the default)
+    AcceleratedClock    sleeps `speed` times faster
+    InstantClock        doesn't sleep, just adds up how long it would have
+
+    KeyboardInput       reads from the keyboard (the default)
+    ScriptedInput       replays a list of answers
+
+    with gameclock.using(gameclock.Console(gameclock.InstantClock(),
+                                           gameclock.ScriptedInput(['1', 'a']))):
+        DM.main()
+
+The GAME_CLOCK environment variable picks the default clock:
+"realtime", "instant" or "accelerated:<speed>", e.g. accelerated:10.
+"""
+
+import contextlib
+import os
+import time
+
+class RealTimeClock(object):
+    """Waits for real."""
+    def sleep(self, seconds):
+        time.sleep(seconds)
+
+class AcceleratedClock(object):
+    """Waits, but `speed` times faster than asked."""
+    def __init__(self, speed):
+        self.speed = speed
+
+    def sleep(self, seconds):
+        time.sleep(seconds / self.speed)
+
+class InstantClock(object):
+    """Never waits.  `elapsed` is how long it would have waited."""
+    def __init__(self):
+        self.elapsed = 0.0
+
+    def sleep(self, seconds):
+        self.elapsed += seconds
+
+class KeyboardInput(object):
+    """Asks the person at the keyboard."""
+    interactive = True
+
+    def __call__(self, prompt):
+        return input(prompt)
+
+class ScriptedInput(object):
+    """Answers prompts from a list, in order.
+
+    Args:
+        answers (iterable of Str): The answers to give.
+        echo (Bool): Print each prompt and answer, like a terminal would.
+
+    Raises:
+        EOFError: When asked for more answers than there are, just like
+            input() at the end of a file.
+
+    """
+    interactive = False
+
+    def __init__(self, answers, echo=False):
+        self._answers = iter(answers)
+        self.echo = echo
+        self.prompts = [] #every prompt asked, handy for checking a game
+
+    def __call__(self, prompt):
+        self.prompts.append(prompt)
+        try:
+            answer = next(self._answers)
+        except StopIteration:
+            raise EOFError(f"No scripted answer for {prompt!r}")
+        if self.echo:
+            print(f"{prompt}{answer}")
+        return answer
+
+class Console(object):
+    """A clock and an input provider, which is all the games need.
+
+    Args:
+        clock: RealTimeClock, AcceleratedClock, InstantClock or anything
+            else with a sleep(seconds) method.  Defaults to the one named
+            by GAME_CLOCK.
+        input: KeyboardInput, ScriptedInput or any callable taking a
+            prompt and returning the answer.
+
+    """
+    def __init__(self, clock=None, input=None):
+        self.clock = clock if clock is not None else clock_from_env()
+        self.input = input if input is not None else KeyboardInput()
+
+    def sleep(self, seconds):
+        self.clock.sleep(seconds)
+
+    def ask(self, prompt=""):
+        return self.input(prompt)
+
+    def clear_screen(self):
+        #only worth doing when someone is looking at the screen
+        if getattr(self.input, 'interactive', True):
+            os.system("cls" if os.name == 'nt' else "clear")
+
+def clock_from_env(setting=None):
+    """Build the clock named by `setting`, or by GAME_CLOCK if not given."""
+    setting = setting or os.environ.get('GAME_CLOCK', 'realtime')
+    name, _, arg = setting.partition(':')
+    if name == 'realtime':
+        return RealTimeClock()
+    if name == 'instant':
+        return InstantClock()
+    if name == 'accelerated':
+        return AcceleratedClock(float(arg or 10))
+    raise ValueError(f"Unknown GAME_CLOCK {setting!r}")
+
+_console = None
+
+def get_console():
+    global _console
+    if _console is None:
+        _console = Console()
+    return _console
+
+def set_console(console):
+    """Make `console` the one the games use.  Returns the old one."""
+    global _console
+    old, _console = _console, console
+    return old
+
+@contextlib.contextmanager
+def using(console):
+    """Use `console` for the duration of a with block."""
+    old = set_console(console)
+    try:
+        yield console
+    finally:
+        set_console(old)
+
+def sleep(seconds):
+    get_console().sleep(seconds)
+
+def ask(prompt=""):
+    return get_console().ask(prompt)
+
+def clear_screen():
+    get_console().clear_screen()
@@ -0,0 +1,38 @@
+"""Import a module now, load it when it's first used.
+
+NumPy takes a tenth of a second or more to import, which is most of the
+start-up time of anything that imports the games, even when it never
+makes an array (a worker process that only plays Battleships, say).
+Modules that only need it once the game is under way import it with
+
+    np = lazyimport.lazy_import('numpy')
+
+which costs next to nothing: the real import happens the first time an
+attribute of `np` is looked up, and afterwards `np` is simply numpy.
+"""
+
+import importlib.util
+import sys
+
+def lazy_import(name):
+    """Return the module `name`, loading it on first attribute access.
+
+    Args:
+        name (String): Absolute module name, e.g. 'numpy'.
+
+    Raises:
+        ModuleNotFoundError: If there's no such module.  That's checked
+            straight away, only the loading is put off.
+
+    """
+    if name in sys.modules:
+        return sys.modules[name]
+    spec = importlib.util.find_spec(name)
+    if spec is None:
+        raise ModuleNotFoundError(f"No module named {name!r}", name=name)
+    loader = importlib.util.LazyLoader(spec.loader)
+    spec.loader = loader
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    loader.exec_module(module)
+    return module
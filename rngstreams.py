@@ -0,0 +1,111 @@
+"""Independent, reproducible random number streams for simulations.
+
+The games take their randomness from an `rng` argument (Troll.attack,
+Hero.attack, AI(rng=...)) that can be any object with the methods of
+random.Random they use: random(), randint() and choice().  By default
+that's the global generator, which every game in the process shares.
+
+For simulations that's no good: results depend on what else drew numbers
+first, and parallel workers can't replay each other's games.  This
+module hands out separate streams instead, all derived from one seed
+with NumPy's SeedSequence, so
+
+  * stream i is the same every time for the same seed
+  * streams don't overlap, however many are spawned
+  * each stream draws numbers from NumPy in blocks, so random() and
+    randint() are cheap, and whole arrays are available too
+
+    streams = rngstreams.spawn(seed=42, n=8)
+    ai = AI(rng=streams[0])
+
+    #one stream per task, so results don't depend on the worker count
+    results = rngstreams.run_parallel(play_game, seed=42, tasks=1000)
+"""
+
+import concurrent.futures
+
+import lazyimport
+
+#loaded on first use, so worker processes that import this start quickly
+np = lazyimport.lazy_import('numpy')
+
+class BatchRandom(object):
+    """A random.Random look-alike backed by a NumPy Generator.
+
+    Single draws come out of a pre-drawn block, refilled `block` numbers
+    at a time.
+
+    Args:
+        generator (numpy.random.Generator): Where the numbers come from.
+        block (Int): How many numbers to draw at a time.
+
+    """
+    def __init__(self, generator, block=4096):
+        self.generator = generator
+        self.block = block
+        self._buffer = generator.random(block)
+        self._next = 0
+
+    def random(self):
+        """A float in [0, 1)."""
+        if self._next == self.block:
+            self._buffer = self.generator.random(self.block)
+            self._next = 0
+        value = self._buffer[self._next]
+        self._next += 1
+        return float(value)
+
+    def randint(self, a, b):
+        """An int N with a <= N <= b, like random.randint."""
+        return a + int(self.random() * (b - a + 1))
+
+    def choice(self, seq):
+        return seq[self.randint(0, len(seq) - 1)]
+
+    def random_batch(self, n):
+        """An array of n floats in [0, 1)."""
+        return self.generator.random(n)
+
+    def randint_batch(self, a, b, n):
+        """An array of n ints between a and b inclusive."""
+        return self.generator.integers(a, b + 1, size=n)
+
+def seed_sequences(seed, n):
+    """n independent child SeedSequences of `seed`."""
+    return np.random.SeedSequence(seed).spawn(n)
+
+def generators(seed, n):
+    """n independent numpy.random.Generators derived from `seed`."""
+    return [np.random.default_rng(s) for s in seed_sequences(seed, n)]
+
+def spawn(seed, n):
+    """n independent BatchRandom streams derived from `seed`."""
+    return [BatchRandom(g) for g in generators(seed, n)]
+
+def _run_task(task, seed_sequence, args):
+    return task(BatchRandom(np.random.default_rng(seed_sequence)), *args)
+
+def run_parallel(task, seed, tasks, workers=None, args=()):
+    """Run task(rng, *args) `tasks` times across a process pool.
+
+    Each call gets its own stream, picked by its position rather than by
+    the worker that happens to run it, so the results are the same for
+    any number of workers and come back in order.
+
+    Args:
+        task: A function at the top level of a module, so it can be
+            sent to the worker processes.
+        seed (Int): The seed every stream is derived from.
+        tasks (Int): How many times to call task.
+        workers (Int): Size of the process pool, defaults to the number
+            of CPUs.
+        args (tuple): Extra arguments for each call.
+
+    Returns:
+        A list of the tasks' return values.
+
+    """
+    sequences = seed_sequences(seed, tasks)
+    with concurrent.futures.ProcessPoolExecutor(workers) as pool:
+        futures = [pool.submit(_run_task, task, s, args) for s in sequences]
+        return [f.result() for f in futures]
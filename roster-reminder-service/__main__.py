@@ -0,0 +1,9 @@
+"""Lets the directory be run as the service: python roster-reminder-service
+
+The modules import each other by plain name (import database), which
+works here because Python puts this directory first on sys.path.
+"""
+
+import main
+
+main.main()
@@ -0,0 +1,127 @@
+"""Compare one email per duty with one digest per person.
+
+Makes up a batch of reminders, PEOPLE volunteers with between 1 and
+MAX_DUTIES duties each, and sends them through a Mailer to an SMTP sink
+on localhost that throws the messages away: once as the old one email
+per duty, then as digests.  No database is needed.
+
+    python benchmark_digests.py [--people 500] [--max-duties 10] [--latency MS]
+
+--latency makes the sink wait before each reply, like a server across
+the network would.
+"""
+
+import argparse
+import datetime
+import random
+import socketserver
+import sys
+import threading
+import time
+
+import digest as dg
+import mailer as em
+
+class SinkHandler(socketserver.StreamRequestHandler):
+    """Enough SMTP for smtplib to deliver a message, which is then dropped."""
+    def reply(self, line):
+        if self.server.latency:
+            time.sleep(self.server.latency)
+        self.wfile.write(line + b"\r\n")
+
+    def handle(self):
+        self.reply(b"220 sink ready")
+        while True:
+            line = self.rfile.readline()
+            if not line:
+                return
+            command = line[:4].upper()
+            if command == b"EHLO":
+                self.reply(b"250 sink")
+            elif command == b"DATA":
+                self.reply(b"354 go ahead")
+                for data in iter(self.rfile.readline, b""):
+                    self.server.bytes += len(data)
+                    if data == b".\r\n":
+                        break
+                self.server.messages += 1
+                self.reply(b"250 thrown away")
+            elif command == b"QUIT":
+                self.reply(b"221 bye")
+                return
+            else: #HELO, MAIL, RCPT, RSET and NOOP
+                self.reply(b"250 ok")
+
+class SmtpSink(socketserver.ThreadingTCPServer):
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, latency=0.0):
+        super().__init__(('localhost', 0), SinkHandler)
+        self.latency = latency
+        self.messages = 0
+        self.bytes = 0
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+def make_notifications(people, max_duties, rng):
+    today = datetime.date.today()
+    notes = []
+    for p in range(people):
+        for _ in range(rng.randint(1, max_duties)):
+            notes.append({'email_address': f'volunteer{p}@example.com',
+                          'name': f'Volunteer {p}',
+                          'duty': f'duty {rng.randrange(7)}',
+                          'date': today + datetime.timedelta(rng.randrange(4))})
+    notes.sort(key=lambda n: n['date'])
+    return notes
+
+def timed(label, sink, send):
+    sink.messages = sink.bytes = 0
+    start = time.perf_counter()
+    send()
+    seconds = time.perf_counter() - start
+    print(f"{label:<16} {sink.messages:>8} {sink.bytes / 1024:>10.0f} "
+          f"{seconds:>9.2f} {seconds / max(sink.messages, 1) * 1000:>12.2f}")
+    return seconds
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--people', type=int, default=500)
+    parser.add_argument('--max-duties', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.0,
+                        help="milliseconds the sink waits before replying")
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    notes = make_notifications(args.people, args.max_duties, random.Random(args.seed))
+    sink = SmtpSink(args.latency / 1000)
+    mailer = em.Mailer('localhost', sink.port)
+    print(f"{len(notes)} reminders for {args.people} people\n")
+    print(f"{'':<16} {'messages':>8} {'KiB':>10} {'seconds':>9} {'ms/message':>12}")
+
+    def per_duty():
+        for note in notes:
+            mailer.send_email(note['email_address'], note['name'], note['duty'],
+                              note['date'])
+
+    def digests():
+        for digest in dg.coalesce(notes):
+            mailer.send_digest(digest)
+
+    slow = timed("one per duty", sink, per_duty)
+    fast = timed("digests", sink, digests)
+    mailer.close()
+
+    start = time.perf_counter()
+    rendered = [dg.render(d) for d in dg.coalesce(notes)]
+    render_seconds = time.perf_counter() - start
+    print(f"\n{slow / fast:.1f}x faster; coalescing and rendering "
+          f"{len(rendered)} digests took {render_seconds * 1000:.1f} ms")
+    sink.shutdown()
+
+if __name__ == '__main__':
+    sys.exit(main())
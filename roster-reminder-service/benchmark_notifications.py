@@ -0,0 +1,74 @@
+"""Check that get_notifications() stays flat as the roster history grows.
+
+Fills a scratch database with past duties (already reminded) in steps up
+to a few million rows, keeping a fixed number of upcoming unsent duties,
+and times get_notifications() at each step.
+
+    DATABASE_URL="dbname=roster_bench" python benchmark_notifications.py
+
+Don't point this at a real roster, it wipes it.
+"""
+
+import datetime
+import statistics
+import sys
+import time
+
+import database as db
+
+STEPS = [10_000, 100_000, 1_000_000, 3_000_000]
+UPCOMING = 200 #unsent duties in the reminder window
+REPEATS = 20
+
+def add_history(cur, count, start):
+    """Insert `count` past duties, built server side to keep it quick."""
+    cur.execute("""
+        INSERT INTO roster (date, duty, name, email_address, reminder_sent)
+        SELECT %s - (i / 50) - 1, 'duty ' || (i %% 7), 'volunteer ' || (i %% 500),
+               'volunteer' || (i %% 500) || '@example.com', TRUE
+        FROM generate_series(%s, %s) AS i
+        """, (datetime.date.today(), start, start + count - 1))
+
+def time_notifications(conn):
+    """Return the median get_notifications() latency in milliseconds."""
+    timings = []
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        notes = db.get_notifications(conn=conn)
+        timings.append((time.perf_counter() - start) * 1000)
+        assert len(notes) == UPCOMING, len(notes)
+    return statistics.median(timings)
+
+def main():
+    conn = db.get_connection()
+    db.migrate(conn)
+    db.wipe_roster(conn)
+    today = datetime.date.today()
+    with conn, conn.cursor() as cur:
+        for i in range(UPCOMING):
+            cur.execute("INSERT INTO roster (date, duty, name, email_address) "
+                        "VALUES (%s, %s, %s, %s)",
+                        (today + datetime.timedelta(days=i % (db.REMINDER_DAYS+1)),
+                         'duty', f'upcoming {i}', f'upcoming{i}@example.com'))
+
+    print(f"{'history':>10} {'median ms':>10}  plan")
+    rows = 0
+    for step in STEPS:
+        with conn, conn.cursor() as cur:
+            add_history(cur, step - rows, rows)
+            cur.execute("ANALYZE roster")
+        rows = step
+        with conn.cursor() as cur:
+            cur.execute("EXPLAIN SELECT * FROM roster "
+                        "WHERE NOT reminder_sent AND date >= %s AND date <= %s "
+                        "AND email_address IS NOT NULL",
+                        (today, today + datetime.timedelta(days=db.REMINDER_DAYS)))
+            plan = cur.fetchall()[0][0].strip()
+        conn.rollback()
+        print(f"{rows:>10} {time_notifications(conn):>10.2f}  {plan}")
+
+    db.wipe_roster(conn)
+    db.close()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,124 @@
+"""Time a multi-tenant sync against local sheets and a scratch database.
+
+Writes TENANTS file sheets to a temporary directory and syncs them all
+three times: from empty, after changing a few duties in every sheet, and
+with nothing changed.  A few of the tenants are made awkward on purpose,
+to check they don't hold the others up:
+
+  * some sheets are missing, so their fetch fails
+  * some sheets take SLOW_SECONDS to download, longer than the timeout
+
+    DATABASE_URL="dbname=roster_bench" python benchmark_tenants.py
+
+Don't point this at a real roster, it wipes the bench- tenants.
+"""
+
+import asyncio
+import datetime
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+import database as db
+import sheets as sh
+import tenants
+
+TENANTS = 300
+DUTIES = 200       #per sheet
+CHANGES = 5        #duties changed in each sheet before the second sync
+MISSING = 5
+SLOW = 5
+SLOW_SECONDS = 3.0
+TIMEOUT = 1.0
+
+class SlowSheet(sh.FileSheet):
+    """A FileSheet on the end of a very slow connection."""
+    def fetch(self, etag=None):
+        time.sleep(SLOW_SECONDS)
+        return super().fetch(etag)
+
+def write_sheet(path, rows):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("date,duty,name,email_address\n")
+        for row in rows:
+            f.write(",".join(row) + "\n")
+
+def make_rows(rng, team):
+    today = datetime.date.today()
+    return [((today + datetime.timedelta(days=rng.randrange(60))).isoformat(),
+             f"duty {rng.randrange(7)}", f"{team} volunteer {i}",
+             f"{team}.volunteer{i}@example.com")
+            for i in range(DUTIES)]
+
+def run(syncer, tenant_list, label):
+    start = time.perf_counter()
+    results = asyncio.run(syncer.run(tenant_list))
+    seconds = time.perf_counter() - start
+    by_status = {}
+    for result in results:
+        by_status.setdefault(result.status, []).append(result)
+    latencies = sorted(r.seconds for r in by_status.get('reloaded', ())
+                       or by_status.get('unchanged', ()))
+    print(f"\n{label}: {len(results)} tenants in {seconds:.2f}s, "
+          + ", ".join(f"{len(rs)} {status}" for status, rs in sorted(by_status.items())))
+    if latencies:
+        print(f"  latency median {statistics.median(latencies) * 1000:.1f} ms, "
+              f"p95 {latencies[int(len(latencies) * 0.95)] * 1000:.1f} ms, "
+              f"max {latencies[-1] * 1000:.1f} ms")
+    for stage in tenants.STAGES:
+        times = [r.stages[stage] for r in results
+                 if stage in r.stages and r.status != 'failed']
+        if times:
+            print(f"  {stage:<6} median {statistics.median(times) * 1000:.2f} ms")
+    return results
+
+def main():
+    rng = random.Random(1)
+    db.migrate()
+    db.close()
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshots = os.path.join(tmp, 'snapshots')
+        os.makedirs(snapshots)
+        tenant_list = []
+        sheets = {}
+        for i in range(TENANTS):
+            name = f"bench-{i}"
+            path = os.path.join(tmp, f"{name}.csv")
+            if i >= MISSING:
+                sheets[path] = make_rows(rng, name)
+                write_sheet(path, sheets[path])
+            source = SlowSheet(path) if i >= TENANTS - SLOW else sh.FileSheet(path)
+            #max_age 0 so every sync looks at the sheets again
+            tenant_list.append(tenants.Tenant(
+                name, source, os.path.join(snapshots, f"{name}.csv"), 0))
+
+        conn = db.connect()
+        for tenant in tenant_list:
+            db.wipe_roster(conn, tenant.name)
+        conn.close()
+
+        syncer = tenants.TenantSync(fetch_workers=16, db_workers=4, timeout=TIMEOUT)
+        try:
+            run(syncer, tenant_list, "first load")
+            for path, rows in sheets.items():
+                for j in rng.sample(range(DUTIES), CHANGES):
+                    date, duty, name, email = rows[j]
+                    rows[j] = (date, f"duty {rng.randrange(7, 14)}", name, email)
+                write_sheet(path, rows)
+            results = run(syncer, tenant_list, f"{CHANGES} changes each")
+            changed = [r for r in results if r.status == 'reloaded']
+            assert all(r.inserted == r.deleted <= CHANGES for r in changed)
+            run(syncer, tenant_list, "unchanged")
+        finally:
+            syncer.close()
+
+        conn = db.connect()
+        for tenant in tenant_list:
+            db.wipe_roster(conn, tenant.name)
+        conn.close()
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,201 @@
+"""Run the reminder service as a long-lived process.
+
+Instead of cron starting main.py from scratch every time, the daemon
+keeps its database and SMTP connections open and runs two kinds of job
+on an asyncio event loop:
+
+  * a poll of the sheet every `poll_interval` seconds (give or take
+    `jitter`), reloading the roster when it has changed.  When a poll
+    fails the wait doubles each time, up to `max_backoff`.
+  * one timer per pending reminder, firing at REMINDER_DAYS before the
+    duty at `send_time`, or straight away if that has already passed.
+
+The database and SMTP libraries block, so all their calls go through a
+single worker thread.  That also means the one connection of each kind
+is only ever used from one thread.
+"""
+
+import asyncio
+import concurrent.futures
+import datetime
+import logging
+import os
+import random
+import signal
+
+import database as db
+import sheets as sh
+import mailer as em
+import ledger
+import main as service
+from metrics import metrics
+
+log = logging.getLogger('roster.daemon')
+
+class ReminderDaemon(object):
+    """The scheduler.
+
+    Args:
+        poll_interval (Float): Seconds between sheet polls.
+        jitter (Float): Fraction by which each poll interval is randomly
+            stretched or shrunk, so a fleet of daemons don't poll in step.
+        max_backoff (Float): The longest wait between polls after errors.
+        send_time (datetime.time): Time of day reminders go out.
+        metrics_file (Str): If given, the metrics are written here after
+            every poll.  See metrics.Metrics.write().
+
+    """
+    def __init__(self, poll_interval=300, jitter=0.1, max_backoff=3600,
+                 send_time=datetime.time(9), metrics_file=None):
+        self.poll_interval = poll_interval
+        self.jitter = jitter
+        self.max_backoff = max_backoff
+        self.send_time = send_time
+        self.metrics_file = metrics_file
+        self.failures = 0
+        self._timers = {} #ledger key: asyncio.TimerHandle
+        self._tasks = set() #sends in progress, kept so they aren't collected
+        self._worker = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        self.ledger = ledger.SendLedger()
+        self._stopping = None
+
+    def _blocking(self, func, *args):
+        """Run a blocking call on the worker thread."""
+        loop = asyncio.get_running_loop()
+        return loop.run_in_executor(self._worker, func, *args)
+
+    def next_poll_delay(self):
+        """Seconds until the next poll, with backoff and jitter applied."""
+        delay = min(self.poll_interval * 2 ** self.failures, self.max_backoff)
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def due_time(self, date):
+        """When the reminder for a duty on `date` should go out."""
+        return datetime.datetime.combine(
+            date - datetime.timedelta(days=db.REMINDER_DAYS), self.send_time)
+
+    def _sync(self):
+        sh.get_cache().refresh(force=True)
+        service.sync_roster()
+        #look a day past the reminder window, so everything that falls due
+        #before the next poll already has a timer
+        until = datetime.date.today() + datetime.timedelta(days=db.REMINDER_DAYS+1)
+        #anything in the ledger went out before a reload or restart
+        return self.ledger.unsent(db.get_pending(until))
+
+    async def poll(self):
+        """Sync the sheet and bring the reminder timers up to date."""
+        try:
+            with metrics.timer('poll'):
+                pending = await self._blocking(self._sync)
+        except Exception:
+            self.failures += 1
+            metrics.count('poll_failures')
+            log.exception("Poll failed (%d in a row)", self.failures)
+            return
+        self.failures = 0
+        self.schedule(pending)
+
+    def schedule(self, pending):
+        """Set a timer for each pending reminder, dropping stale ones."""
+        loop = asyncio.get_running_loop()
+        wanted = {ledger.key_of(n): n for n in pending}
+
+        #duties that vanished from the roster (or were sent elsewhere)
+        for key in set(self._timers) - set(wanted):
+            self._timers.pop(key).cancel()
+
+        now = datetime.datetime.now()
+        for key, note in wanted.items():
+            if key in self._timers:
+                continue
+            delay = max(0, (self.due_time(note['date']) - now).total_seconds())
+            self._timers[key] = loop.call_later(
+                delay, lambda note=note: self._start(self.send(note)))
+        metrics.gauge('scheduled_reminders', len(self._timers))
+
+    def _start(self, coro):
+        """Run `coro` as a task, keeping hold of it until it's done."""
+        task = asyncio.get_running_loop().create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._finished)
+        return task
+
+    def _finished(self, task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.error("Reminder task failed", exc_info=task.exception())
+
+    def _send(self, note):
+        #the ledger claim skips a reminder that was sent by somebody else,
+        #or removed from the sheet, since the timer was set
+        return self.ledger.send(note, em.send_email)
+
+    async def send(self, note):
+        """Send one reminder."""
+        self._timers.pop(ledger.key_of(note), None)
+        metrics.gauge('scheduled_reminders', len(self._timers))
+        try:
+            with metrics.timer('send_email'):
+                sent = await self._blocking(self._send, note)
+        except Exception:
+            metrics.count('send_failures')
+            #it's only marked sent once the ledger claim went through, and
+            #released again if the email didn't, so the next poll
+            #schedules it again
+            log.exception("Couldn't send reminder to %s, will retry after the "
+                          "next poll", note['email_address'])
+            return
+        if sent:
+            metrics.count('emails_sent')
+            log.info("Reminded %s about %s on %s", note['name'],
+                     note['duty'], note['date'])
+        else:
+            metrics.count('emails_skipped')
+
+    async def run(self):
+        """Poll and send reminders until stop() is called."""
+        self._stopping = asyncio.Event()
+        await self._blocking(db.migrate)
+        await self._blocking(self.ledger.load)
+        while not self._stopping.is_set():
+            await self.poll()
+            if self.metrics_file:
+                metrics.write(self.metrics_file)
+            try:
+                await asyncio.wait_for(self._stopping.wait(),
+                                       self.next_poll_delay())
+            except asyncio.TimeoutError:
+                pass
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        #let sends already under way finish before closing the connections
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        await self._blocking(em.close)
+        await self._blocking(db.close)
+        self._worker.shutdown()
+
+    def stop(self):
+        if self._stopping is not None:
+            self._stopping.set()
+
+def main(metrics_file=None):
+    logging.basicConfig(level=logging.INFO,
+                        format="%(asctime)s %(levelname)s %(message)s")
+    daemon = ReminderDaemon(
+        poll_interval=float(os.environ.get('ROSTER_POLL_INTERVAL', 300)),
+        send_time=datetime.time.fromisoformat(
+            os.environ.get('ROSTER_SEND_TIME', '09:00')),
+        metrics_file=metrics_file or os.environ.get('ROSTER_METRICS_FILE'))
+
+    async def run():
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, daemon.stop)
+        await daemon.run()
+
+    asyncio.run(run())
+
+if __name__ == '__main__':
+    main()
@@ -1,33 +1,229 @@
-import psycopg2
+"""Postgres storage for the roster reminder service.
 
+The roster table holds one row per duty.  Two indexes keep the hot
+queries cheap no matter how much history piles up:
 
-# Connect to an existing database
->>> conn = psycopg2.connect("dbname=d111tgr235584s user=rdrwftcmlyxpjx password=")
+    roster_date_name_idx  (date, name)  -- "who is on when" lookups
+    roster_unsent_idx     (date) WHERE NOT reminder_sent
+                                        -- only reminders still to go out
 
-# Open a cursor to perform database operations
->>> cur = conn.cursor()
+get_notifications() is a range scan over the partial index.  It only
+reads: a reminder is marked as sent when it is claimed in the send
+ledger, in the same transaction, so a failure anywhere before that
+leaves it due (see ledger.py).
 
-# Execute a command: this creates a new table
->>> cur.execute("CREATE TABLE test (id serial PRIMARY KEY, num integer, data varchar);")
+Every row belongs to a tenant (a team with its own sheet, see
+tenants.py).  The single sheet of main.py is the tenant ''.
 
-# Pass data to fill a query placeholders and let Psycopg perform
-# the correct conversion (no more SQL injections!)
->>> cur.execute("INSERT INTO test (num, data) VALUES (%s, %s)",
-...      (100, "abc'def"))
+psycopg2 is imported when the first connection is opened, not when this
+module is, so the service starts (and --help answers) without it.
+"""
 
-# Query the database and obtain data as Python objects
->>> cur.execute("SELECT * FROM test;")
->>> cur.fetchone()
-(1, 100, "abc'def")
+import datetime
+import os
 
-# Make the changes to the database persistent
->>> conn.commit()
+#Each entry is one schema version.  Never edit an entry that has been
+#released, add a new one to the end instead.
+MIGRATIONS = [
+    #1: roster schema
+    """
+    CREATE TABLE roster (
+        id            serial PRIMARY KEY,
+        date          date NOT NULL,
+        duty          varchar NOT NULL,
+        name          varchar NOT NULL,
+        email_address varchar,
+        reminder_sent boolean NOT NULL DEFAULT FALSE
+    );
+    CREATE INDEX roster_date_name_idx ON roster (date, name);
+    CREATE INDEX roster_unsent_idx ON roster (date) WHERE NOT reminder_sent;
+    """,
+    #2: send ledger, see ledger.py
+    """
+    CREATE TABLE send_ledger (
+        email_address varchar NOT NULL,
+        duty          varchar NOT NULL,
+        date          date NOT NULL,
+        sent_at       timestamptz NOT NULL DEFAULT now()
+    );
+    CREATE UNIQUE INDEX send_ledger_key_idx
+        ON send_ledger (email_address, duty, date);
+    CREATE INDEX send_ledger_date_idx ON send_ledger (date);
+    """,
+    #3: many teams' rosters in one table, see tenants.py
+    """
+    ALTER TABLE roster ADD COLUMN tenant varchar NOT NULL DEFAULT '';
+    CREATE INDEX roster_tenant_date_idx ON roster (tenant, date);
 
-# Close communication with the database
->>> cur.close()
->>> conn.close()
+    CREATE TABLE tenant_sync (
+        tenant        varchar PRIMARY KEY,
+        last_modified date,
+        synced_at     timestamptz NOT NULL DEFAULT now()
+    );
+    """,
+    #4: each tenant's reminders are kept apart in the send ledger
+    """
+    ALTER TABLE send_ledger ADD COLUMN tenant varchar NOT NULL DEFAULT '';
+    DROP INDEX send_ledger_key_idx;
+    CREATE UNIQUE INDEX send_ledger_key_idx
+        ON send_ledger (tenant, email_address, duty, date);
+    """,
+]
 
+#How many days ahead of a duty the reminder goes out
+REMINDER_DAYS = 3
 
-print("this is a test")
+_conn = None
 
+def connect():
+    """Open a new connection.
 
+    The connection string comes from the DATABASE_URL environment
+    variable, e.g. "dbname=roster user=roster password=secret".
+
+    """
+    import psycopg2
+    return psycopg2.connect(os.environ.get("DATABASE_URL", "dbname=roster"))
+
+def get_connection():
+    """Return the shared connection, opening it on first use."""
+    global _conn
+    if _conn is None or _conn.closed:
+        _conn = connect()
+    return _conn
+
+def close():
+    """Close the shared connection if it is open."""
+    global _conn
+    if _conn is not None and not _conn.closed:
+        _conn.close()
+    _conn = None
+
+def migrate(conn=None):
+    """Bring the schema up to date.
+
+    Applies every entry of MIGRATIONS that the database hasn't seen yet,
+    all in one transaction, so a failed migration leaves nothing behind.
+
+    Returns:
+        The schema version after migrating.
+
+    """
+    conn = conn or get_connection()
+    with conn, conn.cursor() as cur:
+        cur.execute("CREATE TABLE IF NOT EXISTS schema_version "
+                    "(version integer NOT NULL)")
+        #stop two processes migrating at the same time
+        cur.execute("LOCK TABLE schema_version IN EXCLUSIVE MODE")
+        cur.execute("SELECT max(version) FROM schema_version")
+        current = cur.fetchone()[0] or 0
+        for version, sql in enumerate(MIGRATIONS[current:], start=current+1):
+            cur.execute(sql)
+            cur.execute("INSERT INTO schema_version (version) VALUES (%s)",
+                        (version,))
+    return len(MIGRATIONS)
+
+def wipe_roster(conn=None, tenant=''):
+    """Delete every duty of `tenant` from the roster."""
+    conn = conn or get_connection()
+    with conn, conn.cursor() as cur:
+        cur.execute("DELETE FROM roster WHERE tenant = %s", (tenant,))
+
+def insert_duty(date, duty, name, email_address=None, conn=None):
+    """Add a single duty to the roster."""
+    conn = conn or get_connection()
+    with conn, conn.cursor() as cur:
+        cur.execute("INSERT INTO roster (date, duty, name, email_address) "
+                    "VALUES (%s, %s, %s, %s)",
+                    (date, duty, name, email_address))
+
+def get_notifications(days=REMINDER_DAYS, today=None, conn=None):
+    """Return the reminders that are due.
+
+    A reminder is due when its duty falls between today and `days` days
+    from now and it hasn't been sent yet.  Nothing is marked as sent:
+    claim them with ledger.SendLedger, which does that.
+
+    Args:
+        days (Int): How many days ahead to look.
+        today (datetime.date): Defaults to the current date.
+
+    Returns:
+        A list of dicts with the keys tenant, email_address, name, duty and
+        date, ordered by date.
+
+    """
+    today = today or datetime.date.today()
+    return get_pending(today + datetime.timedelta(days=days), today, conn)
+
+def _notification(row):
+    return {'tenant': row[0], 'email_address': row[1], 'name': row[2],
+            'duty': row[3], 'date': row[4]}
+
+def get_pending(until, today=None, conn=None):
+    """Return the unsent reminders for duties from today up to `until`.
+
+    Used by the daemon to schedule reminders ahead of time.
+
+    Returns:
+        A list of dicts with the keys tenant, email_address, name, duty and
+        date.
+
+    """
+    conn = conn or get_connection()
+    today = today or datetime.date.today()
+    with conn, conn.cursor() as cur:
+        #the WHERE clause matches the roster_unsent_idx predicate so the
+        #planner can range scan the partial index
+        cur.execute("""
+            SELECT tenant, email_address, name, duty, date FROM roster
+            WHERE NOT reminder_sent
+              AND date >= %s AND date <= %s
+              AND email_address IS NOT NULL
+            ORDER BY date
+            """, (today, until))
+        rows = cur.fetchall()
+    return [_notification(r) for r in rows]
+
+def get_tenant_roster(tenant, conn=None):
+    """Return every duty of `tenant`.
+
+    Returns:
+        A list of (id, date, duty, name, email_address) tuples.
+
+    """
+    conn = conn or get_connection()
+    with conn, conn.cursor() as cur:
+        cur.execute("SELECT id, date, duty, name, email_address FROM roster "
+                    "WHERE tenant = %s", (tenant,))
+        return cur.fetchall()
+
+def apply_roster_changes(tenant, delete_ids, inserts, last_modified, conn=None):
+    """Change a tenant's roster, all in one transaction.
+
+    Args:
+        tenant (Str): Whose roster.
+        delete_ids (list): Ids of the rows to delete.
+        inserts (list): (date, duty, name, email_address) tuples to add.
+        last_modified (datetime.date): Modified date of the sheet they
+            came from, kept in tenant_sync.
+
+    """
+    from psycopg2.extras import execute_values
+    conn = conn or get_connection()
+    with conn, conn.cursor() as cur:
+        if delete_ids:
+            cur.execute("DELETE FROM roster WHERE id = ANY(%s)", (list(delete_ids),))
+        if inserts:
+            #one statement for the lot rather than a round trip per row
+            execute_values(cur,
+                           "INSERT INTO roster (tenant, date, duty, name, email_address) "
+                           "VALUES %s",
+                           [(tenant,) + tuple(row) for row in inserts],
+                           page_size=1000)
+        cur.execute("""
+            INSERT INTO tenant_sync (tenant, last_modified, synced_at)
+            VALUES (%s, %s, now())
+            ON CONFLICT (tenant) DO UPDATE
+            SET last_modified = EXCLUDED.last_modified, synced_at = now()
+            """, (tenant, last_modified))
@@ -0,0 +1,91 @@
+"""Combine a volunteer's reminders into one email.
+
+Someone rostered on for ten duties this week would otherwise get ten
+emails, one SMTP transaction each.  coalesce() groups the pending
+reminders by email address and name instead, so each person gets a
+digest listing their duties, and both the number of messages and the
+time spent talking to the SMTP server go with the number of people
+rather than the number of duties.  People who share an address, a
+family say, get a digest each, addressed to them.
+
+A digest covers at most `window` days: a person's duties more than
+that after the first one in a digest start a new one.  The default
+window, ROSTER_DIGEST_DAYS, is REMINDER_DAYS, so one run's reminders
+for a person always go in a single email.
+
+The emails are rendered from string.Templates built once when the
+module is imported.  A single duty is worded just like the old
+one-per-duty reminders.
+"""
+
+import collections
+import datetime
+import os
+import string
+
+import database as db
+
+Digest = collections.namedtuple('Digest', 'email_address name notes')
+
+SUBJECT_ONE = string.Template("Roster reminder: $duty on $day")
+SUBJECT_MANY = string.Template("Roster reminders: $count duties from $day")
+BODY_ONE = string.Template(
+    "Hi $name,\n\n"
+    "Just a reminder that you're rostered on for $duty on $long_day.\n\n"
+    "Thanks!\n")
+BODY_MANY = string.Template(
+    "Hi $name,\n\n"
+    "Just a reminder that you're rostered on for:\n\n"
+    "$lines\n"
+    "Thanks!\n")
+LINE = string.Template("  $long_day  $duty\n")
+
+def default_window():
+    return int(os.environ.get('ROSTER_DIGEST_DAYS', db.REMINDER_DAYS))
+
+def coalesce(notifications, window=None):
+    """Group notifications into digests.
+
+    Args:
+        notifications (list): Notification dicts, as from
+            db.get_notifications().
+        window (Int): Days a digest can span.  Defaults to
+            default_window().
+
+    Returns:
+        A list of Digests, in order of their first duty.  Each digest's
+        notes are in date order.
+
+    """
+    if window is None:
+        window = default_window()
+    span = datetime.timedelta(days=window)
+    people = {}
+    for note in sorted(notifications, key=lambda n: n['date']):
+        people.setdefault((note['email_address'], note['name']), []).append(note)
+
+    digests = []
+    for (email_address, name), notes in people.items():
+        first = 0
+        for i in range(1, len(notes) + 1):
+            if i == len(notes) or notes[i]['date'] - notes[first]['date'] > span:
+                digests.append(Digest(email_address, name, notes[first:i]))
+                first = i
+    digests.sort(key=lambda d: d.notes[0]['date'])
+    return digests
+
+def render(digest):
+    """Return the (subject, body) of a digest's email."""
+    notes = digest.notes
+    first = notes[0]
+    if len(notes) == 1:
+        return (SUBJECT_ONE.substitute(duty=first['duty'],
+                                       day=f"{first['date']:%A %d %B}"),
+                BODY_ONE.substitute(name=digest.name, duty=first['duty'],
+                                    long_day=f"{first['date']:%A %d %B %Y}"))
+    lines = "".join(LINE.substitute(duty=note['duty'],
+                                    long_day=f"{note['date']:%a %d %b %Y}")
+                    for note in notes)
+    return (SUBJECT_MANY.substitute(count=len(notes),
+                                    day=f"{first['date']:%A %d %B}"),
+            BODY_MANY.substitute(name=digest.name, lines=lines))
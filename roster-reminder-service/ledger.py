@@ -0,0 +1,191 @@
+"""A permanent record of every reminder sent.
+
+The roster's reminder_sent flag is lost whenever the roster is reloaded
+from the sheet, so it can't stop a reminder going out twice.  The send
+ledger can: it's a separate table keyed by (tenant, email_address, duty,
+date) with a unique index, that only ever has rows added.
+
+Before a reminder is sent it is claimed in the ledger.  Only one claim
+for a key can succeed, so a reminder goes out at most once no matter
+how often the service is restarted or reloaded.  The claim also marks
+the roster row as sent, in the same transaction, so until a claim has
+gone through the reminder stays due and the next run or poll picks it
+up.  If the send itself fails the claim is released again, and the
+roster row marked unsent, for the same reason.
+
+A SendLedger also keeps the keys it knows about in memory, so checking
+a reminder that was already sent is a set lookup, not a database query.
+Only ledger rows for duties from `since` onwards are loaded, since older
+duties can't be reminded about any more.
+"""
+
+import datetime
+
+import database as db
+
+def key_of(note):
+    """The ledger key of a notification dict."""
+    return (note.get('tenant', ''), note['email_address'], note['duty'], note['date'])
+
+class SendLedger(object):
+    """The ledger plus its in-memory prefilter.
+
+    Args:
+        since (datetime.date): Load ledger entries for duties on or after
+            this date.  Defaults to today.
+        conn: A database connection, defaults to the shared one.
+
+    """
+    def __init__(self, since=None, conn=None):
+        self.since = since or datetime.date.today()
+        self.conn = conn
+        self._sent = None
+
+    def load(self):
+        """Read the ledger entries for current duties into memory."""
+        conn = self.conn or db.get_connection()
+        with conn, conn.cursor() as cur:
+            cur.execute("SELECT tenant, email_address, duty, date FROM send_ledger "
+                        "WHERE date >= %s", (self.since,))
+            self._sent = set(cur.fetchall())
+        return len(self._sent)
+
+    def __contains__(self, key):
+        """Has `key` been sent?  Answered from memory."""
+        if self._sent is None:
+            self.load()
+        return key in self._sent
+
+    def __len__(self):
+        if self._sent is None:
+            self.load()
+        return len(self._sent)
+
+    def unsent(self, notifications):
+        """Return the notifications that aren't in the ledger yet."""
+        return [n for n in notifications if key_of(n) not in self]
+
+    def claim(self, key):
+        """Record `key` as sent, before sending it.
+
+        Returns:
+            True if the caller should go ahead and send, False if it was
+            already sent, by this process or any other, or the duty has
+            gone from the roster.
+
+        """
+        return bool(self.claim_many([key]))
+
+    def claim_many(self, keys):
+        """claim() several keys in one transaction.
+
+        The roster rows of the keys are marked as sent, and the keys of
+        the rows still on the roster are added to the ledger.
+
+        Returns:
+            The keys that were claimed, in the order given.
+
+        """
+        from psycopg2.extras import execute_values
+        wanted = [key for key in dict.fromkeys(keys) if key not in self]
+        if not wanted:
+            return []
+        conn = self.conn or db.get_connection()
+        with conn, conn.cursor() as cur:
+            on_roster = set(execute_values(
+                cur, "UPDATE roster AS r SET reminder_sent = TRUE "
+                     "FROM (VALUES %s) AS k (tenant, email_address, duty, date) "
+                     "WHERE r.tenant = k.tenant "
+                     "AND r.email_address = k.email_address "
+                     "AND r.duty = k.duty AND r.date = k.date "
+                     "RETURNING r.tenant, r.email_address, r.duty, r.date",
+                wanted, fetch=True))
+            wanted = [key for key in wanted if key in on_roster]
+            claimed = set(execute_values(
+                cur, "INSERT INTO send_ledger (tenant, email_address, duty, date) "
+                     "VALUES %s ON CONFLICT DO NOTHING "
+                     "RETURNING tenant, email_address, duty, date",
+                wanted, fetch=True)) if wanted else set()
+        #only once it's committed, so a failed claim can be tried again
+        self._sent.update(wanted)
+        return [key for key in wanted if key in claimed]
+
+    def release(self, key):
+        """Undo a claim whose send failed, so it can be retried."""
+        self.release_many([key])
+
+    def release_many(self, keys):
+        """release() several keys with one query each.
+
+        As well as removing the claims, the roster rows their claims
+        marked as sent are marked unsent again, so that the next run or
+        poll picks them up.
+
+        """
+        from psycopg2.extras import execute_values
+        conn = self.conn or db.get_connection()
+        with conn, conn.cursor() as cur:
+            execute_values(cur, "DELETE FROM send_ledger AS l USING (VALUES %s) "
+                                "AS k (tenant, email_address, duty, date) "
+                                "WHERE l.tenant = k.tenant "
+                                "AND l.email_address = k.email_address "
+                                "AND l.duty = k.duty AND l.date = k.date", keys)
+            execute_values(cur, "UPDATE roster AS r SET reminder_sent = FALSE "
+                                "FROM (VALUES %s) "
+                                "AS k (tenant, email_address, duty, date) "
+                                "WHERE r.tenant = k.tenant "
+                                "AND r.email_address = k.email_address "
+                                "AND r.duty = k.duty AND r.date = k.date", keys)
+        if self._sent is not None:
+            self._sent.difference_update(keys)
+
+    def send(self, note, send_email):
+        """Claim and send one notification.
+
+        Args:
+            note (dict): A notification from the database.
+            send_email: Called as send_email(email_address, name, duty,
+                date) to actually send it.
+
+        Returns:
+            True if it was sent, False if it had been sent already.
+
+        """
+        key = key_of(note)
+        if not self.claim(key):
+            return False
+        try:
+            send_email(note['email_address'], note['name'], note['duty'],
+                       note['date'])
+        except Exception:
+            self.release(key)
+            raise
+        return True
+
+    def send_digest(self, digest, send_digest):
+        """Claim and send a digest of notifications.
+
+        Only the duties that can be claimed go in the email, so a duty
+        already reminded about by another run isn't repeated.
+
+        Args:
+            digest (digest.Digest): The notifications to send.
+            send_digest: Called with the digest of claimed notifications
+                to actually send it.
+
+        Returns:
+            The number of notifications sent, 0 if they all had been sent
+            already.
+
+        """
+        claimed = set(self.claim_many([key_of(note) for note in digest.notes]))
+        if not claimed:
+            return 0
+        digest = digest._replace(
+            notes=[note for note in digest.notes if key_of(note) in claimed])
+        try:
+            send_digest(digest)
+        except Exception:
+            self.release_many(list(claimed))
+            raise
+        return len(digest.notes)
@@ -0,0 +1,110 @@
+"""Send reminder emails.
+
+Named mailer rather than email so it doesn't hide the standard library
+email package, which smtplib needs.
+
+The SMTP server is configured with SMTP_HOST, SMTP_PORT, SMTP_USER,
+SMTP_PASSWORD and SMTP_FROM.  One connection is kept open and reused for
+every message, and reopened if the server drops it.
+
+smtplib and the email package take a while to import and aren't needed
+until there's something to send, so they're imported then.
+"""
+
+import os
+
+import digest as dg
+
+class Mailer(object):
+    """A reusable SMTP connection.
+
+    Args:
+        host (Str), port (Int): The SMTP server.
+        user (Str), password (Str): Login details, or None to skip login.
+        sender (Str): The From address.
+        starttls (Bool): Upgrade the connection with STARTTLS.
+
+    """
+    def __init__(self, host='localhost', port=25, user=None, password=None,
+                 sender='roster@localhost', starttls=False):
+        self.host = host
+        self.port = port
+        self.user = user
+        self.password = password
+        self.sender = sender
+        self.starttls = starttls
+        self._smtp = None
+
+    def connect(self):
+        """Open the connection if it isn't already open."""
+        if self._smtp is None:
+            import smtplib
+            smtp = smtplib.SMTP(self.host, self.port, timeout=30)
+            if self.starttls:
+                smtp.starttls()
+            if self.user:
+                smtp.login(self.user, self.password)
+            self._smtp = smtp
+        return self._smtp
+
+    def close(self):
+        if self._smtp is not None:
+            import smtplib
+            try:
+                self._smtp.quit()
+            except smtplib.SMTPException:
+                pass
+            self._smtp = None
+
+    def send(self, message):
+        """Send an EmailMessage, reconnecting once if the server hung up."""
+        import smtplib
+        if message['From'] is None:
+            message['From'] = self.sender
+        try:
+            self.connect().send_message(message)
+        except smtplib.SMTPServerDisconnected:
+            self._smtp = None
+            self.connect().send_message(message)
+
+    def send_text(self, email_address, subject, body):
+        """Send a plain text email."""
+        from email.message import EmailMessage
+        message = EmailMessage()
+        message['To'] = email_address
+        message['Subject'] = subject
+        message.set_content(body)
+        self.send(message)
+
+    def send_digest(self, digest):
+        """Send a dg.Digest of reminders as one email."""
+        self.send_text(digest.email_address, *dg.render(digest))
+
+    def send_email(self, email_address, name, duty, date):
+        """Remind `name` that they are on `duty` on `date`."""
+        self.send_digest(dg.Digest(email_address, name,
+                                   [{'duty': duty, 'date': date}]))
+
+_mailer = None
+
+def get_mailer():
+    """Return the Mailer configured by the environment."""
+    global _mailer
+    if _mailer is None:
+        _mailer = Mailer(os.environ.get('SMTP_HOST', 'localhost'),
+                         int(os.environ.get('SMTP_PORT', 25)),
+                         os.environ.get('SMTP_USER'),
+                         os.environ.get('SMTP_PASSWORD'),
+                         os.environ.get('SMTP_FROM', 'roster@localhost'),
+                         os.environ.get('SMTP_STARTTLS') == '1')
+    return _mailer
+
+def send_email(email_address, name, duty, date):
+    get_mailer().send_email(email_address, name, duty, date)
+
+def send_digest(digest):
+    get_mailer().send_digest(digest)
+
+def close():
+    if _mailer is not None:
+        _mailer.close()
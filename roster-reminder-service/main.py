@@ -1,23 +1,139 @@
+"""Roster reminder service.
+
+    python main.py            sync the roster and send due reminders, once
+    python main.py --daemon   keep running, see daemon.py
+
+or run the directory itself, python roster-reminder-service [options].
+
+    --metrics FILE   write stage timings and counters to FILE, as JSON if
+                     it ends in .json, otherwise in Prometheus text format
+    --profile FILE   run once under cProfile and save the stats to FILE
+    --digest-days N  put each person's reminders for duties up to N days
+                     apart in one email (default ROSTER_DIGEST_DAYS, or
+                     REMINDER_DAYS), see digest.py
+    --tenants FILE   sync every team's sheet listed in FILE instead of the
+                     single ROSTER_SHEET, see tenants.py
+"""
+
+import argparse
+import sys
+
 import database as db
 import sheets as sh
-import email as em
-import datetime
+import mailer as em
+import digest as dg
+import ledger
+from metrics import metrics
+
+def sync_roster():
+    """Reload the roster if the sheet changed since it was last loaded.
 
-#get last modified date, a datetime.date object
-last_modified_date_db = db.get_last_modified_date()
-last_modified_date_sh = sh.get_last_modified_date()
+    This is answered from the local snapshot, so an unchanged sheet costs
+    no download and no roster reload.
 
-if last_modified_date_db != last_modified_date_sh :
-    db.wipe_roster()
-    duties = sh.get_duties() #list of something
+    Returns:
+        True if the roster was reloaded.
+
+    """
+    with metrics.timer('sheet_fetch'):
+        changed = sh.has_changed()
+    if not changed:
+        return False
+    with metrics.timer('wipe_roster'):
+        db.wipe_roster()
+    duties = sh.get_duties()
     for duty in duties:
-        db.insert_duty(duty['date'], duty['duty'], duty['name'])
+        with metrics.timer('insert_duty'):
+            db.insert_duty(duty['date'], duty['duty'], duty['name'],
+                           duty.get('email_address'))
+        metrics.count('duties_loaded')
+    sh.mark_loaded()
+    metrics.count('roster_reloads')
+    return True
+
+def sync_many(path):
+    """Sync the tenants listed in `path`, reporting any that failed."""
+    import tenants
+    for result in tenants.sync_tenants(path):
+        if result.status == 'failed':
+            print(f"Couldn't sync {result.name}: {result.error}", file=sys.stderr)
+
+def run_once(tenants_file=None, digest_days=None):
+    #has_changed() is answered from the snapshot, so find out whether the
+    #sheet changed before touching the database at all
+    if tenants_file:
+        changed = True
+    else:
+        with metrics.timer('sheet_fetch'):
+            changed = sh.has_changed()
+    with metrics.timer('migrate'):
+        db.migrate()
+    if changed:
+        with metrics.timer('sync_roster'):
+            if tenants_file:
+                sync_many(tenants_file)
+            else:
+                sync_roster()
+
+    #send a digest to each person, leaving out anything already in the ledger
+    with metrics.timer('get_notifications'):
+        notifications = db.get_notifications()
+    metrics.gauge('pending_notifications', len(notifications))
+    with metrics.timer('ledger_load'):
+        sent = ledger.SendLedger()
+        sent.load()
+    with metrics.timer('coalesce'):
+        digests = dg.coalesce(notifications, digest_days)
+    metrics.gauge('pending_digests', len(digests))
+
+    for i, digest in enumerate(digests):
+        try:
+            with metrics.timer('send_email'):
+                count = sent.send_digest(digest, em.send_digest)
+        except Exception as e:
+            #nothing is left marked sent, whether the ledger claim or the
+            #email failed, so the next run tries again
+            metrics.count('send_failures')
+            print(f"Couldn't send reminders to {digest.email_address}: {e}",
+                  file=sys.stderr)
+            metrics.gauge('pending_digests', len(digests) - i - 1)
+            continue
+        if count:
+            metrics.count('emails_sent')
+        metrics.count('duties_reminded', count)
+        metrics.count('emails_skipped', len(digest.notes) - count)
+        metrics.gauge('pending_digests', len(digests) - i - 1)
+    em.close()
 
-#send out emails
-db.get_notifications()
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Send roster reminders.")
+    parser.add_argument('--daemon', action='store_true',
+                        help="keep running and send reminders when they fall due")
+    parser.add_argument('--metrics', metavar='FILE',
+                        help="write timings and counters to FILE")
+    parser.add_argument('--profile', metavar='FILE',
+                        help="profile a single run and save the stats to FILE")
+    parser.add_argument('--tenants', metavar='FILE',
+                        help="sync the teams' sheets listed in FILE")
+    parser.add_argument('--digest-days', type=int, metavar='N',
+                        help="combine reminders for duties up to N days apart")
+    args = parser.parse_args(argv)
+    if args.daemon and args.profile:
+        parser.error("--profile profiles a single run, it can't be used with --daemon")
+    if args.daemon:
+        import daemon
+        daemon.main(metrics_file=args.metrics)
+    elif args.profile:
+        import cProfile
+        import pstats
+        cProfile.runctx('run_once(tenants_file, digest_days)', globals(),
+                        {'tenants_file': args.tenants,
+                         'digest_days': args.digest_days}, args.profile)
+        pstats.Stats(args.profile).sort_stats('cumulative').print_stats(25)
+    else:
+        run_once(args.tenants, args.digest_days)
+    if args.metrics and not args.daemon:
+        metrics.write(args.metrics)
 
-for note in notifications:
-    em.send_email(note['email_address'], \
-                  note['name'],\
-                  note['duty'],\
-                  note['date'])
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+"""Timers, counters and gauges for the reminder service.
+
+    with metrics.timer('insert_duty'):
+        db.insert_duty(...)
+    metrics.count('emails_sent')
+    metrics.gauge('pending_notifications', len(notifications))
+    metrics.gauge('tenant_sync_seconds', 0.4, tenant='choir', stage='fetch')
+
+The numbers can be written out as a Prometheus text file (for the node
+exporter's textfile collector) or as JSON.
+
+Metrics can be updated from any thread: the daemon records from both
+its event loop and its worker thread.
+"""
+
+import contextlib
+import json
+import os
+import threading
+import time
+
+def _escape(value):
+    """A label value as Prometheus wants it quoted."""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+class Metrics(object):
+    """A set of named timers, counters and gauges.
+
+    Args:
+        prefix (Str): Put in front of every name when exporting to
+            Prometheus.
+
+    """
+    def __init__(self, prefix='roster_'):
+        self.prefix = prefix
+        self.timers = {} #name: [count, total seconds, max seconds]
+        self.counters = {}
+        self.gauges = {}
+        self.labelled = {} #name: {((label, value), ...): gauge value}
+        self._lock = threading.Lock()
+
+    @contextlib.contextmanager
+    def timer(self, name):
+        """Time the body of a with statement."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def observe(self, name, seconds):
+        """Add one timing, in seconds, to the timer `name`."""
+        with self._lock:
+            t = self.timers.setdefault(name, [0, 0.0, 0.0])
+            t[0] += 1
+            t[1] += seconds
+            t[2] = max(t[2], seconds)
+
+    def count(self, name, n=1):
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def gauge(self, name, value, **labels):
+        """Set a gauge.  With labels, each set of labels is its own gauge."""
+        with self._lock:
+            if labels:
+                key = tuple(sorted(labels.items()))
+                self.labelled.setdefault(name, {})[key] = value
+            else:
+                self.gauges[name] = value
+
+    def reset(self):
+        with self._lock:
+            self.timers.clear()
+            self.counters.clear()
+            self.gauges.clear()
+            self.labelled.clear()
+
+    def _snapshot(self):
+        """Copies of the timers, counters, gauges and labelled gauges."""
+        with self._lock:
+            return ({name: tuple(t) for name, t in self.timers.items()},
+                    dict(self.counters), dict(self.gauges),
+                    {name: dict(values) for name, values in self.labelled.items()})
+
+    def summary(self):
+        """Return everything as a dict, ready to dump as JSON."""
+        timers, counters, gauges, labelled = self._snapshot()
+        return {
+            'timers': {name: {'count': c, 'total_seconds': total,
+                              'mean_seconds': total / c if c else 0.0,
+                              'max_seconds': mx}
+                       for name, (c, total, mx) in timers.items()},
+            'counters': counters,
+            'gauges': gauges,
+            'labelled_gauges': {name: [dict(labels, value=value)
+                                       for labels, value in values.items()]
+                                for name, values in labelled.items()},
+        }
+
+    def to_prometheus(self):
+        """Return everything in the Prometheus text exposition format."""
+        p = self.prefix
+        timers, counters, gauges, labelled = self._snapshot()
+        lines = []
+        if timers:
+            lines.append(f"# TYPE {p}stage_seconds summary")
+            for name, (c, total, mx) in sorted(timers.items()):
+                lines.append(f'{p}stage_seconds_count{{stage="{name}"}} {c}')
+                lines.append(f'{p}stage_seconds_sum{{stage="{name}"}} {total:.6f}')
+            lines.append(f"# TYPE {p}stage_seconds_max gauge")
+            for name, (c, total, mx) in sorted(timers.items()):
+                lines.append(f'{p}stage_seconds_max{{stage="{name}"}} {mx:.6f}')
+        for name, value in sorted(counters.items()):
+            lines.append(f"# TYPE {p}{name}_total counter")
+            lines.append(f"{p}{name}_total {value}")
+        for name, value in sorted(gauges.items()):
+            lines.append(f"# TYPE {p}{name} gauge")
+            lines.append(f"{p}{name} {value}")
+        for name, values in sorted(labelled.items()):
+            lines.append(f"# TYPE {p}{name} gauge")
+            for labels, value in sorted(values.items()):
+                text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+                lines.append(f"{p}{name}{{{text}}} {value}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path):
+        """Write the metrics to `path`.
+
+        Files ending in .json get the JSON summary, anything else gets the
+        Prometheus format.  The file is replaced in one go, so a scraper
+        never sees half of it.
+
+        """
+        if path.endswith('.json'):
+            text = json.dumps(self.summary(), indent=2)
+        else:
+            text = self.to_prometheus()
+        tmp = path + '.tmp'
+        with open(tmp, 'w') as f:
+            f.write(text)
+        os.replace(tmp, path)
+
+#the service's metrics
+metrics = Metrics()
+timer = metrics.timer
+count = metrics.count
+gauge = metrics.gauge
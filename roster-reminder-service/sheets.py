@@ -0,0 +1,245 @@
+"""Fetch the roster spreadsheet, keeping a local snapshot of it.
+
+The roster is read as CSV with a header row of date, duty, name and
+(optionally) email_address.  Dates are ISO formatted, e.g. 2018-08-31.
+
+A SheetCache keeps the last download on disk along with its ETag, so a
+run only downloads the sheet when it has changed:
+
+  * if the snapshot was checked less than `max_age` seconds ago the
+    source isn't contacted at all
+  * otherwise the source is asked whether its ETag has changed, and only
+    sends the rows if it has
+
+The snapshot also remembers which version was last loaded into the
+database, so has_changed() can answer without a database query.
+
+Set ROSTER_SHEET to a file path or an http(s) URL of the published CSV,
+and ROSTER_SNAPSHOT to where the snapshot should live.
+"""
+
+import csv
+import datetime
+import hashlib
+import io
+import json
+import os
+import time
+
+class FileSheet(object):
+    """A sheet stored as a local CSV file.
+
+    Stands in for the real spreadsheet when testing.  The ETag is built
+    from the file's size and modification time.
+
+    Args:
+        path (Str): The CSV file.
+
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def fetch(self, etag=None):
+        """Fetch the sheet if it has changed.
+
+        Args:
+            etag (Str): The ETag of the copy we already have, if any.
+
+        Returns:
+            None if the sheet still matches `etag`, otherwise a tuple of
+            (etag, modified date as a datetime.date, CSV bytes).
+
+        """
+        st = os.stat(self.path)
+        new_etag = f"{st.st_size:x}-{st.st_mtime_ns:x}"
+        if new_etag == etag:
+            return None
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        return new_etag, datetime.date.fromtimestamp(st.st_mtime), data
+
+class HttpSheet(object):
+    """A sheet published as CSV at a URL.
+
+    Uses a conditional GET, so an unchanged sheet costs a 304 response
+    and no body.
+
+    Args:
+        url (Str): Where the CSV is published.
+        timeout (Float): Seconds to wait for the server.
+
+    """
+    def __init__(self, url, timeout=30):
+        self.url = url
+        self.timeout = timeout
+
+    def fetch(self, etag=None):
+        """Fetch the sheet if it has changed.  Same contract as FileSheet."""
+        #only needed for a sheet on the web, and slow to import
+        import email.utils
+        import urllib.error
+        import urllib.request
+        request = urllib.request.Request(self.url)
+        if etag is not None:
+            request.add_header('If-None-Match', etag)
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as resp:
+                data = resp.read()
+                headers = resp.headers
+        except urllib.error.HTTPError as e:
+            if e.code == 304:
+                return None
+            raise
+
+        modified = headers.get('Last-Modified')
+        if modified:
+            modified = email.utils.parsedate_to_datetime(modified).date()
+        else:
+            modified = datetime.date.today()
+        #servers without ETags still work, we just download every time
+        new_etag = headers.get('ETag') or hashlib.sha1(data).hexdigest()
+        return new_etag, modified, data
+
+def open_sheet(location):
+    """Return a FileSheet or HttpSheet depending on what `location` is."""
+    if location.startswith(('http://', 'https://')):
+        return HttpSheet(location)
+    return FileSheet(location)
+
+class SheetCache(object):
+    """A sheet source backed by an on-disk snapshot.
+
+    The snapshot file is one JSON header line followed by the CSV exactly
+    as it was downloaded.
+
+    Args:
+        source: A FileSheet, HttpSheet or anything else with a matching
+            fetch() method.
+        snapshot_path (Str): Where to keep the snapshot.
+        max_age (Float): Seconds a snapshot is trusted without asking the
+            source again.
+
+    """
+    def __init__(self, source, snapshot_path, max_age=300):
+        self.source = source
+        self.snapshot_path = snapshot_path
+        self.max_age = max_age
+        self._header = None
+        self._refreshed = False
+
+    def _read_header(self):
+        try:
+            with open(self.snapshot_path, 'rb') as f:
+                return json.loads(f.readline())
+        except (OSError, ValueError):
+            return None
+
+    def _write(self, header, data):
+        #write to a temporary file and rename, so a crash never leaves a
+        #half written snapshot behind
+        tmp = self.snapshot_path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(json.dumps(header).encode() + b'\n')
+            if data is not None:
+                f.write(data)
+            else:
+                with open(self.snapshot_path, 'rb') as old:
+                    old.readline()
+                    f.write(old.read())
+        os.replace(tmp, self.snapshot_path)
+
+    def refresh(self, force=False):
+        """Make sure the snapshot is current.
+
+        Only contacts the source once per SheetCache, and not at all if
+        the snapshot is younger than max_age.
+
+        Returns:
+            True if a new version of the sheet was downloaded.
+
+        """
+        if self._refreshed and not force:
+            return False
+        self._refreshed = True
+        header = self._read_header()
+        now = time.time()
+        if header is not None and not force \
+        and now - header['checked'] < self.max_age:
+            self._header = header
+            return False
+
+        result = self.source.fetch(header['etag'] if header else None)
+        if result is None:
+            header['checked'] = now
+            self._write(header, None)
+            self._header = header
+            return False
+
+        etag, modified, data = result
+        self._header = {'etag': etag,
+                        'modified': modified.isoformat(),
+                        'checked': now,
+                        'loaded': header['loaded'] if header else None}
+        self._write(self._header, data)
+        return True
+
+    def get_last_modified_date(self):
+        """Return the date the sheet was last modified, a datetime.date."""
+        self.refresh()
+        return datetime.date.fromisoformat(self._header['modified'])
+
+    def has_changed(self):
+        """Is the snapshot newer than what was last loaded into the database?"""
+        self.refresh()
+        return self._header['loaded'] != self._header['etag']
+
+    def mark_loaded(self):
+        """Record that the current snapshot has been loaded into the database."""
+        self.refresh()
+        self._header['loaded'] = self._header['etag']
+        self._write(self._header, None)
+
+    def get_duties(self):
+        """Yield each duty in the sheet as a dict.
+
+        Rows are parsed one at a time straight from the snapshot, so the
+        whole sheet is never held in memory.  Each dict has the keys date
+        (a datetime.date), duty, name and email_address (None if blank).
+        Rows without a date are skipped.
+
+        """
+        self.refresh()
+        with open(self.snapshot_path, 'rb') as f:
+            f.readline()
+            text = io.TextIOWrapper(f, encoding='utf-8-sig', newline='')
+            for row in csv.DictReader(text):
+                date = (row.get('date') or '').strip()
+                if not date:
+                    continue
+                yield {'date': datetime.date.fromisoformat(date),
+                       'duty': row['duty'].strip(),
+                       'name': row['name'].strip(),
+                       'email_address': (row.get('email_address') or '').strip() or None}
+
+_cache = None
+
+def get_cache():
+    """Return the SheetCache configured by the environment."""
+    global _cache
+    if _cache is None:
+        _cache = SheetCache(open_sheet(os.environ['ROSTER_SHEET']),
+                            os.environ.get('ROSTER_SNAPSHOT', 'roster_snapshot.csv'),
+                            float(os.environ.get('ROSTER_SHEET_MAX_AGE', 300)))
+    return _cache
+
+def get_last_modified_date():
+    return get_cache().get_last_modified_date()
+
+def has_changed():
+    return get_cache().has_changed()
+
+def mark_loaded():
+    get_cache().mark_loaded()
+
+def get_duties():
+    return get_cache().get_duties()
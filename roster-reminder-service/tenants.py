@@ -0,0 +1,356 @@
+"""Sync the rosters of many teams at once.
+
+Each tenant (a team) has its own sheet and its own rows in the roster
+table.  They're listed in a CSV file with the columns tenant and sheet,
+where sheet is a file path or URL like ROSTER_SHEET:
+
+    tenant,sheet
+    choir,https://docs.google.com/spreadsheets/d/e/.../pub?output=csv
+    youth,/srv/rosters/youth.csv
+
+A sync runs every tenant through three stages:
+
+    fetch   download the sheet if it changed, and parse it
+    diff    compare it with the tenant's rows in the database
+    write   delete the rows that went, bulk insert the new ones
+
+Fetches run on `fetch_workers` threads and the database stages on
+`db_workers` threads with a connection each.  In between is a queue of
+`queue_size` sheets, so when the database falls behind the fetching
+waits rather than piling parsed sheets up in memory.
+
+Tenants don't hold each other up: a failing tenant is reported and the
+rest carry on, and a fetch that takes longer than `timeout` is given up
+on (its thread stays out of the pool until the download does finish or
+time out, so a hanging server can only ever tie up one fetch slot).
+
+Only changed duties are touched, so the rest keep their reminder_sent
+flags, and a tenant whose sheet hasn't changed costs no database work
+at all.
+
+    python tenants.py tenants.csv           sync them and show the timings
+    python main.py --tenants tenants.csv    sync them and send reminders
+"""
+
+import argparse
+import asyncio
+import concurrent.futures
+import csv
+import hashlib
+import os
+import re
+import sys
+import threading
+import time
+
+import database as db
+import sheets as sh
+from metrics import metrics
+
+STAGES = ('fetch', 'diff', 'write')
+
+class Tenant(object):
+    """One team and its sheet.
+
+    Args:
+        name (Str): Stored with each of its duties.  Can't be '', which
+            is the single sheet of main.py.
+        source: A FileSheet, HttpSheet or anything else with fetch().
+        snapshot_path (Str): Where to keep its SheetCache snapshot.
+        max_age (Float): See SheetCache.
+
+    """
+    def __init__(self, name, source, snapshot_path, max_age=300):
+        if not name:
+            raise ValueError("A tenant needs a name")
+        self.name = name
+        self.source = source
+        self.snapshot_path = snapshot_path
+        self.max_age = max_age
+
+    def cache(self):
+        #a SheetCache only asks its source once, so a new one for each sync
+        return sh.SheetCache(self.source, self.snapshot_path, self.max_age)
+
+def snapshot_name(tenant):
+    """The file name of a tenant's snapshot.
+
+    Readable, but with a hash of the whole name so that tenants like
+    "A/B" and "A B" don't share a file.
+
+    """
+    digest = hashlib.sha1(tenant.encode('utf-8')).hexdigest()[:12]
+    return f"{re.sub(r'[^A-Za-z0-9_.-]', '_', tenant)}-{digest}.csv"
+
+def load_tenants(path, snapshot_dir='snapshots', max_age=300):
+    """Read the tenants CSV file.
+
+    Raises:
+        ValueError: If a tenant is listed twice or has no name.
+
+    """
+    os.makedirs(snapshot_dir, exist_ok=True)
+    tenants = []
+    seen = set()
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        for row in csv.DictReader(f):
+            name = (row.get('tenant') or '').strip()
+            if name in seen:
+                raise ValueError(f"Tenant {name!r} is listed twice in {path}")
+            seen.add(name)
+            filename = snapshot_name(name)
+            tenants.append(Tenant(name, sh.open_sheet(row['sheet'].strip()),
+                                  os.path.join(snapshot_dir, filename), max_age))
+    return tenants
+
+def diff_roster(current, duties):
+    """Work out how to turn the current rows into the sheet's duties.
+
+    Args:
+        current (list): (id, date, duty, name, email_address) rows.
+        duties (list): (date, duty, name, email_address) tuples.
+
+    Returns:
+        (ids of rows to delete, duties to insert).  Duplicated duties are
+        matched up one for one.
+
+    """
+    spare = {}
+    for row in current:
+        spare.setdefault(tuple(row[1:]), []).append(row[0])
+    inserts = []
+    for duty in duties:
+        ids = spare.get(duty)
+        if ids:
+            ids.pop()
+        else:
+            inserts.append(duty)
+    return [i for ids in spare.values() for i in ids], inserts
+
+class TenantResult(object):
+    """How one tenant's sync went.
+
+    status is 'reloaded', 'unchanged' or 'failed' (with the reason in
+    error), stages maps each stage that ran to its seconds, and seconds
+    is the whole time from starting the fetch to finishing the write.
+
+    """
+    def __init__(self, name):
+        self.name = name
+        self.status = None
+        self.error = None
+        self.stages = {}
+        self.seconds = 0.0
+        self.deleted = 0
+        self.inserted = 0
+
+    def fail(self, error):
+        self.status = 'failed'
+        self.error = error
+
+def _fetch(tenant):
+    """The fetch stage, on a fetch thread.
+
+    Returns:
+        None if the sheet is as last loaded, otherwise (cache, modified
+        date, duties).
+
+    """
+    cache = tenant.cache()
+    if not cache.has_changed():
+        return None
+    duties = [(d['date'], d['duty'], d['name'], d['email_address'])
+              for d in cache.get_duties()]
+    return cache, cache.get_last_modified_date(), duties
+
+class TenantSync(object):
+    """Syncs tenants through the fetch, diff and write pipeline.
+
+    Args:
+        fetch_workers (Int): Sheets downloaded at once.
+        db_workers (Int): Database connections, and writes at once.
+        timeout (Float): Seconds before a fetch is given up on.
+        queue_size (Int): Fetched sheets that can wait for the database.
+            Defaults to twice db_workers.
+        connect: Opens a database connection, db.connect by default.
+
+    """
+    def __init__(self, fetch_workers=8, db_workers=2, timeout=120,
+                 queue_size=None, connect=None):
+        self.fetch_workers = fetch_workers
+        self.db_workers = db_workers
+        self.timeout = timeout
+        self.queue_size = queue_size or 2 * db_workers
+        self.connect = connect or db.connect
+        self._fetch_pool = concurrent.futures.ThreadPoolExecutor(
+            fetch_workers, thread_name_prefix='fetch')
+        self._db_pool = concurrent.futures.ThreadPoolExecutor(
+            db_workers, thread_name_prefix='db')
+        self._local = threading.local()
+        self._connections = []
+        self._lock = threading.Lock()
+
+    def _connection(self):
+        """This database thread's own connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or conn.closed:
+            conn = self._local.conn = self.connect()
+            with self._lock:
+                self._connections.append(conn)
+        return conn
+
+    def _diff_and_write(self, tenant, result, cache, modified, duties):
+        """The diff and write stages, on a database thread."""
+        conn = self._connection()
+        start = time.perf_counter()
+        delete_ids, inserts = diff_roster(db.get_tenant_roster(tenant.name, conn),
+                                          duties)
+        result.stages['diff'] = time.perf_counter() - start
+        start = time.perf_counter()
+        db.apply_roster_changes(tenant.name, delete_ids, inserts, modified, conn)
+        result.stages['write'] = time.perf_counter() - start
+        #only once the database has it, so a failed write is tried again
+        cache.mark_loaded()
+        result.deleted = len(delete_ids)
+        result.inserted = len(inserts)
+        result.status = 'reloaded'
+
+    async def run(self, tenants):
+        """Sync every tenant.
+
+        Returns:
+            A TenantResult per tenant, in the same order.
+
+        """
+        loop = asyncio.get_running_loop()
+        queue = asyncio.Queue(self.queue_size)
+        slots = asyncio.Semaphore(self.fetch_workers)
+        results = [TenantResult(tenant.name) for tenant in tenants]
+        started = {}
+
+        async def fetch(tenant, result):
+            await slots.acquire()
+            started[result.name] = start = time.perf_counter()
+            future = loop.run_in_executor(self._fetch_pool, _fetch, tenant)
+            #the slot comes back when the thread does, not at the timeout
+            future.add_done_callback(lambda _: slots.release())
+            try:
+                fetched = await asyncio.wait_for(asyncio.shield(future),
+                                                 self.timeout)
+            except asyncio.TimeoutError:
+                result.fail(f"fetch took over {self.timeout}s")
+                return
+            except Exception as e:
+                result.fail(e)
+                return
+            finally:
+                result.stages['fetch'] = time.perf_counter() - start
+            if fetched is None:
+                result.status = 'unchanged'
+                return
+            await queue.put((tenant, result, fetched))
+
+        async def write():
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                tenant, result, fetched = item
+                try:
+                    await loop.run_in_executor(self._db_pool, self._diff_and_write,
+                                               tenant, result, *fetched)
+                except Exception as e:
+                    result.fail(e)
+                finally:
+                    result.seconds = time.perf_counter() - started[result.name]
+
+        writers = [asyncio.create_task(write()) for _ in range(self.db_workers)]
+        await asyncio.gather(*(fetch(tenant, result)
+                               for tenant, result in zip(tenants, results)))
+        for _ in writers:
+            await queue.put(None)
+        await asyncio.gather(*writers)
+
+        for result in results:
+            if not result.seconds: #never got as far as the database
+                result.seconds = result.stages.get('fetch', 0.0)
+            record(result)
+        return results
+
+    def close(self):
+        """Close the connections and stop the threads."""
+        self._fetch_pool.shutdown(wait=False)
+        self._db_pool.shutdown()
+        with self._lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+
+def record(result):
+    """Add a tenant's sync to the metrics."""
+    for stage in STAGES:
+        if stage in result.stages:
+            metrics.observe(f'tenant_{stage}', result.stages[stage])
+            metrics.gauge('tenant_sync_stage_seconds', round(result.stages[stage], 6),
+                          tenant=result.name, stage=stage)
+    metrics.gauge('tenant_sync_seconds', round(result.seconds, 6), tenant=result.name)
+    metrics.gauge('tenant_sync_failed', int(result.status == 'failed'),
+                  tenant=result.name)
+    metrics.count(f'tenants_{result.status}')
+
+def sync_tenants(path, **options):
+    """Sync the tenants listed in `path`, the way main.py does.
+
+    The snapshots go in ROSTER_SNAPSHOT_DIR (default "snapshots"), and
+    ROSTER_SHEET_MAX_AGE applies to every sheet.  Keyword arguments go to
+    TenantSync.
+
+    Returns:
+        The TenantResults.
+
+    """
+    tenants = load_tenants(path, os.environ.get('ROSTER_SNAPSHOT_DIR', 'snapshots'),
+                           float(os.environ.get('ROSTER_SHEET_MAX_AGE', 300)))
+    syncer = TenantSync(**options)
+    try:
+        return asyncio.run(syncer.run(tenants))
+    finally:
+        syncer.close()
+
+def report(results, out=sys.stdout):
+    """Print a line per tenant, slowest first."""
+    print(f"{'tenant':<20} {'status':<10} {'total':>8} "
+          + " ".join(f"{stage:>8}" for stage in STAGES)
+          + f" {'-rows':>6} {'+rows':>6}", file=out)
+    for r in sorted(results, key=lambda r: -r.seconds):
+        stages = " ".join(f"{r.stages[s]:8.3f}" if s in r.stages else f"{'':>8}"
+                          for s in STAGES)
+        line = (f"{r.name:<20} {r.status:<10} {r.seconds:8.3f} {stages} "
+                f"{r.deleted:>6} {r.inserted:>6}")
+        if r.error is not None:
+            line += f"  {r.error}"
+        print(line, file=out)
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync many teams' rosters.")
+    parser.add_argument('tenants', help="CSV file of tenant,sheet")
+    parser.add_argument('--fetch-workers', type=int, default=8)
+    parser.add_argument('--db-workers', type=int, default=2)
+    parser.add_argument('--timeout', type=float, default=120,
+                        help="seconds before giving up on a sheet")
+    parser.add_argument('--metrics', metavar='FILE',
+                        help="write timings and counters to FILE")
+    args = parser.parse_args()
+    db.migrate()
+    db.close()
+    start = time.perf_counter()
+    results = sync_tenants(args.tenants, fetch_workers=args.fetch_workers,
+                           db_workers=args.db_workers, timeout=args.timeout)
+    report(results)
+    print(f"\n{len(results)} tenants in {time.perf_counter() - start:.2f}s")
+    if args.metrics:
+        metrics.write(args.metrics)
+    return 1 if any(r.status == 'failed' for r in results) else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,43 @@
+"""Fixtures for the reminder service tests.
+
+    ROSTER_TEST_DATABASE_URL="dbname=roster_test" python -m pytest roster-reminder-service/tests
+
+The tests that need Postgres use the database named by
+ROSTER_TEST_DATABASE_URL and are skipped without it.  Don't point it at
+a real roster: every test starts by wiping the database.
+"""
+
+import datetime
+import os
+import sys
+
+import pytest
+
+#the service's modules import each other as siblings
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import database as db
+
+@pytest.fixture
+def conn(monkeypatch):
+    """A freshly migrated scratch database, also used as db's shared one."""
+    url = os.environ.get('ROSTER_TEST_DATABASE_URL')
+    if not url:
+        pytest.skip("ROSTER_TEST_DATABASE_URL isn't set")
+    pytest.importorskip('psycopg2')
+    monkeypatch.setenv('DATABASE_URL', url)
+    db.close()
+    conn = db.get_connection()
+    with conn, conn.cursor() as cur:
+        cur.execute("DROP SCHEMA public CASCADE; CREATE SCHEMA public")
+    db.migrate(conn)
+    yield conn
+    db.close()
+
+def add_duty(conn, days, duty, name, email_address, tenant=''):
+    """Put a duty `days` days from today on the roster."""
+    with conn, conn.cursor() as cur:
+        cur.execute("INSERT INTO roster (tenant, date, duty, name, email_address) "
+                    "VALUES (%s, %s, %s, %s, %s)",
+                    (tenant, datetime.date.today() + datetime.timedelta(days=days),
+                     duty, name, email_address))
@@ -0,0 +1,28 @@
+import datetime
+
+import digest as dg
+
+DAY = datetime.date(2026, 10, 19)
+
+def note(days, duty, name, email_address):
+    return {'tenant': '', 'email_address': email_address, 'name': name,
+            'duty': duty, 'date': DAY + datetime.timedelta(days=days)}
+
+def test_one_digest_per_person_and_window():
+    digests = dg.coalesce([note(0, 'tea', 'Ann', 'ann@example.com'),
+                           note(2, 'door', 'Ann', 'ann@example.com'),
+                           note(9, 'tea', 'Ann', 'ann@example.com'),
+                           note(1, 'tea', 'Bob', 'bob@example.com')], window=3)
+    assert [(d.name, [n['duty'] for n in d.notes]) for d in digests] == [
+        ('Ann', ['tea', 'door']), ('Bob', ['tea']), ('Ann', ['tea'])]
+
+def test_people_sharing_an_address_get_their_own_digest():
+    digests = dg.coalesce([note(0, 'tea', 'Ann', 'family@example.com'),
+                           note(1, 'door', 'Bob', 'family@example.com'),
+                           note(2, 'flowers', 'Bob', 'family@example.com')])
+    ann, bob = digests
+    assert [n['duty'] for n in ann.notes] == ['tea']
+    subject, body = dg.render(bob)
+    assert body.startswith("Hi Bob,")
+    assert "door" in body and "flowers" in body and "tea" not in body
+    assert subject == "Roster reminders: 2 duties from Tuesday 20 October"
@@ -0,0 +1,96 @@
+import datetime
+import smtplib
+
+import daemon
+import database as db
+import ledger
+import main
+import mailer as em
+import sheets as sh
+from conftest import add_duty
+
+def test_failed_send_is_delivered_by_the_next_run(conn, monkeypatch):
+    add_duty(conn, 1, 'tea', 'Ann', 'ann@example.com')
+    add_duty(conn, 2, 'door', 'Ann', 'ann@example.com')
+    add_duty(conn, 1, 'tea', 'Bob', 'bob@example.com')
+    monkeypatch.setattr(sh, 'has_changed', lambda: False)
+    down = {'ann@example.com'}
+    delivered = []
+
+    def send_digest(digest):
+        if digest.email_address in down:
+            raise smtplib.SMTPServerDisconnected("gone")
+        delivered.extend((digest.email_address, n['duty']) for n in digest.notes)
+
+    monkeypatch.setattr(em, 'send_digest', send_digest)
+
+    #Ann's failure doesn't stop Bob's reminder
+    main.run_once()
+    assert delivered == [('bob@example.com', 'tea')]
+
+    down.clear()
+    main.run_once()
+    assert sorted(delivered) == [('ann@example.com', 'door'),
+                                 ('ann@example.com', 'tea'),
+                                 ('bob@example.com', 'tea')]
+
+    #and nothing goes twice
+    main.run_once()
+    assert len(delivered) == 3
+
+def test_failed_claim_is_delivered_by_the_next_run(conn, monkeypatch):
+    add_duty(conn, 1, 'tea', 'Ann', 'ann@example.com')
+    monkeypatch.setattr(sh, 'has_changed', lambda: False)
+    delivered = []
+    monkeypatch.setattr(em, 'send_digest', delivered.append)
+    claim_many = ledger.SendLedger.claim_many
+
+    def fail(self, keys):
+        raise ConnectionError("database went away")
+
+    monkeypatch.setattr(ledger.SendLedger, 'claim_many', fail)
+    main.run_once()
+    assert delivered == []
+
+    monkeypatch.setattr(ledger.SendLedger, 'claim_many', claim_many)
+    main.run_once()
+    assert [n['duty'] for d in delivered for n in d.notes] == ['tea']
+
+def test_failed_daemon_claim_is_pending_again(conn, monkeypatch):
+    add_duty(conn, 1, 'tea', 'Ann', 'ann@example.com')
+    until = datetime.date.today() + datetime.timedelta(days=3)
+    note, = db.get_pending(until)
+    reminders = daemon.ReminderDaemon()
+    monkeypatch.setattr(em, 'send_email', lambda *args: None)
+
+    def fail(self, key):
+        raise ConnectionError("database went away")
+
+    monkeypatch.setattr(ledger.SendLedger, 'claim', fail)
+    try:
+        reminders._send(note)
+    except ConnectionError:
+        pass
+    assert reminders.ledger.unsent(db.get_pending(until)) == [note]
+
+def test_claim_skips_duties_gone_from_the_roster(conn):
+    add_duty(conn, 1, 'tea', 'Ann', 'ann@example.com')
+    note, = db.get_notifications()
+    db.wipe_roster(conn)
+    assert not ledger.SendLedger().claim(ledger.key_of(note))
+    assert ledger.SendLedger().load() == 0
+
+def test_failed_send_is_pending_again(conn):
+    add_duty(conn, 1, 'tea', 'Ann', 'ann@example.com')
+    note, = db.get_pending(datetime.date.today() + datetime.timedelta(days=3))
+    sent = ledger.SendLedger()
+
+    def fail(*args):
+        raise smtplib.SMTPServerDisconnected("gone")
+
+    try:
+        sent.send(note, fail)
+    except smtplib.SMTPServerDisconnected:
+        pass
+    assert ledger.key_of(note) not in sent
+    assert db.get_pending(note['date']) == [note]
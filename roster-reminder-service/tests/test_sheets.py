@@ -0,0 +1,68 @@
+import datetime
+import os
+
+import sheets as sh
+
+ROWS = ("date,duty,name,email_address\n"
+        "2026-10-20,tea,Ann,ann@example.com\n"
+        ",,,\n"
+        "2026-10-21,door,Bob,\n")
+
+class CountingSheet(sh.FileSheet):
+    """A FileSheet that counts how often it's asked."""
+    def __init__(self, path):
+        super().__init__(path)
+        self.fetches = 0
+
+    def fetch(self, etag=None):
+        self.fetches += 1
+        return super().fetch(etag)
+
+def write(path, text, mtime):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+    os.utime(path, (mtime, mtime))
+
+def test_snapshot_remembers_what_was_loaded(tmp_path):
+    sheet, snapshot = tmp_path / 'roster.csv', str(tmp_path / 'snapshot.csv')
+    write(sheet, ROWS, 1_700_000_000)
+    cache = sh.SheetCache(sh.FileSheet(str(sheet)), snapshot, max_age=0)
+    assert cache.has_changed()
+    assert cache.get_last_modified_date() == datetime.date.fromtimestamp(1_700_000_000)
+    cache.mark_loaded()
+
+    #a later run knows it's loaded without asking anything but the snapshot
+    assert not sh.SheetCache(sh.FileSheet(str(sheet)), snapshot, 0).has_changed()
+
+    write(sheet, ROWS + "2026-10-22,flowers,Cat,cat@example.com\n", 1_700_000_100)
+    cache = sh.SheetCache(sh.FileSheet(str(sheet)), snapshot, 0)
+    assert cache.has_changed()
+    assert [d['duty'] for d in cache.get_duties()] == ['tea', 'door', 'flowers']
+
+def test_source_isnt_asked_within_max_age(tmp_path):
+    sheet, snapshot = tmp_path / 'roster.csv', str(tmp_path / 'snapshot.csv')
+    write(sheet, ROWS, 1_700_000_000)
+    source = CountingSheet(str(sheet))
+    sh.SheetCache(source, snapshot, max_age=300).mark_loaded()
+    assert source.fetches == 1
+
+    write(sheet, ROWS + "2026-10-22,flowers,Cat,\n", 1_700_000_100)
+    assert not sh.SheetCache(source, snapshot, max_age=300).has_changed()
+    assert source.fetches == 1
+    assert sh.SheetCache(source, snapshot, max_age=0).has_changed()
+    assert source.fetches == 2
+
+def test_unchanged_sheet_keeps_the_snapshot(tmp_path):
+    sheet, snapshot = tmp_path / 'roster.csv', str(tmp_path / 'snapshot.csv')
+    write(sheet, ROWS, 1_700_000_000)
+    sh.SheetCache(sh.FileSheet(str(sheet)), snapshot, 0).mark_loaded()
+
+    #the source says nothing changed: only the header is rewritten
+    cache = sh.SheetCache(sh.FileSheet(str(sheet)), snapshot, 0)
+    assert not cache.refresh()
+    assert not os.path.exists(snapshot + '.tmp')
+    assert list(cache.get_duties()) == [
+        {'date': datetime.date(2026, 10, 20), 'duty': 'tea', 'name': 'Ann',
+         'email_address': 'ann@example.com'},
+        {'date': datetime.date(2026, 10, 21), 'duty': 'door', 'name': 'Bob',
+         'email_address': None}]
@@ -0,0 +1,78 @@
+import asyncio
+import datetime
+
+import database as db
+import ledger
+import sheets as sh
+import tenants
+from conftest import add_duty
+
+def write_sheet(path, rows):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("date,duty,name,email_address\n")
+        for row in rows:
+            f.write(",".join(row) + "\n")
+
+def roster(conn, tenant):
+    return sorted(row[1:] for row in db.get_tenant_roster(tenant, conn))
+
+def test_snapshot_names_dont_collide():
+    assert tenants.snapshot_name("A/B") != tenants.snapshot_name("A B")
+    assert tenants.snapshot_name("choir").startswith("choir-")
+
+def test_migrations_add_tenant_columns(conn):
+    with conn, conn.cursor() as cur:
+        cur.execute("SELECT table_name, column_name FROM information_schema.columns "
+                    "WHERE column_name = 'tenant'")
+        assert set(cur.fetchall()) == {('roster', 'tenant'),
+                                       ('tenant_sync', 'tenant'),
+                                       ('send_ledger', 'tenant')}
+
+def test_wipe_roster_only_touches_one_tenant(conn):
+    add_duty(conn, 1, 'tea', 'Ann', 'ann@example.com')
+    add_duty(conn, 1, 'tea', 'Ann', 'ann@example.com', tenant='choir')
+    db.wipe_roster(conn, 'choir')
+    assert roster(conn, 'choir') == []
+    assert len(roster(conn, '')) == 1
+
+def test_sync_applies_only_the_changes(conn, tmp_path):
+    today = datetime.date.today()
+    rows = [((today + datetime.timedelta(days=i)).isoformat(), f'duty {i}',
+             f'Person {i}', f'person{i}@example.com') for i in range(5)]
+    write_sheet(tmp_path / 'choir.csv', rows)
+    write_sheet(tmp_path / 'youth.csv', rows[:2])
+    team = [tenants.Tenant(name, sh.FileSheet(str(tmp_path / f'{name}.csv')),
+                           str(tmp_path / tenants.snapshot_name(name)), 0)
+            for name in ('choir', 'youth')]
+    team.append(tenants.Tenant('broken', sh.FileSheet(str(tmp_path / 'missing.csv')),
+                               str(tmp_path / 'broken.csv'), 0))
+    syncer = tenants.TenantSync(fetch_workers=2, db_workers=2)
+    try:
+        results = asyncio.run(syncer.run(team))
+        assert [r.status for r in results] == ['reloaded', 'reloaded', 'failed']
+        assert len(roster(conn, 'choir')) == 5
+        assert len(roster(conn, 'youth')) == 2
+
+        #one duty changes hands; the untouched rows keep their ids
+        before = {row[0] for row in db.get_tenant_roster('choir', conn)}
+        rows[0] = rows[0][:2] + ('Someone Else', 'else@example.com')
+        write_sheet(tmp_path / 'choir.csv', rows)
+        choir, youth, _ = asyncio.run(syncer.run(team))
+        assert (choir.status, choir.deleted, choir.inserted) == ('reloaded', 1, 1)
+        assert youth.status == 'unchanged'
+        after = {row[0] for row in db.get_tenant_roster('choir', conn)}
+        assert len(before & after) == 4
+        with conn, conn.cursor() as cur:
+            cur.execute("SELECT tenant FROM tenant_sync ORDER BY tenant")
+            assert cur.fetchall() == [('choir',), ('youth',)]
+    finally:
+        syncer.close()
+
+def test_tenants_dont_share_ledger_entries(conn):
+    add_duty(conn, 1, 'tea', 'Ann', 'ann@example.com', tenant='choir')
+    add_duty(conn, 1, 'tea', 'Ann', 'ann@example.com', tenant='youth')
+    notes = db.get_notifications()
+    assert sorted(n['tenant'] for n in notes) == ['choir', 'youth']
+    sent = ledger.SendLedger()
+    assert all(sent.send(note, lambda *args: None) for note in notes)
+    assert ledger.SendLedger().load() == 2
@@ -0,0 +1,7 @@
+"""Shared setup for the tests of the top-level modules and the games."""
+
+import os
+import sys
+
+#the games are imported as packages from the top of the repository
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
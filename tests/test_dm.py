@@ -0,0 +1,18 @@
+from Notepads.DM import Troll
+from Notepads.entities import EntityStore
+
+def test_troll_attack_strength_is_still_a_class_attribute(monkeypatch):
+    store = EntityStore()
+    old = Troll(store)
+    assert Troll.attack_strength == Troll.base_attack_strength == 5
+
+    #setting it on the class changes what new trolls start with
+    monkeypatch.setattr(Troll, 'attack_strength', 7)
+    assert Troll.base_attack_strength == 7
+    assert Troll(store).attack_strength == 7
+    assert old.attack_strength == 5
+
+    #and setting it on a troll changes only that troll
+    old.attack_strength = 9
+    assert store.attack_strength[old.id] == 9
+    assert Troll.attack_strength == 7
@@ -0,0 +1,29 @@
+import pytest
+
+pytest.importorskip('numpy')
+
+import rngstreams
+from Battleships.Battlesheets import AI, Gameboard
+
+def place_fleet(rng):
+    """Where an AI using `rng` puts its ships."""
+    board = Gameboard()
+    AI(rng).place_ships(board)
+    return [(s.type, s.pos.pos, s.orientation) for s in board.ships]
+
+def test_results_dont_depend_on_the_worker_count():
+    one = rngstreams.run_parallel(place_fleet, seed=7, tasks=12, workers=1)
+    many = rngstreams.run_parallel(place_fleet, seed=7, tasks=12, workers=4)
+    assert one == many
+    assert one == [place_fleet(rng) for rng in rngstreams.spawn(seed=7, n=12)]
+    #and the games aren't all the same one
+    assert len({tuple(fleet) for fleet in one}) > 1
+
+def test_streams_replay_across_blocks():
+    a, b = rngstreams.spawn(seed=3, n=2)
+    again = rngstreams.spawn(seed=3, n=1)[0]
+    #more draws than a block, so the buffer is refilled on the way
+    draws = [a.randint(1, 6) for _ in range(a.block + 10)]
+    assert draws == [again.randint(1, 6) for _ in range(again.block + 10)]
+    assert set(draws) == {1, 2, 3, 4, 5, 6}
+    assert draws[:50] != [b.randint(1, 6) for _ in range(50)]
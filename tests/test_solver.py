@@ -0,0 +1,66 @@
+import random
+
+from Battleships.solver import PlacementCounter
+
+def placements(width, height, length):
+    """Every way to put a ship of `length` on the board, as sets of squares."""
+    found = []
+    for y in range(height):
+        for x in range(width):
+            if x + length <= width:
+                found.append(frozenset((x + i, y) for i in range(length)))
+            if y + length <= height:
+                found.append(frozenset((x, y + i) for i in range(length)))
+    return found
+
+def brute_force(width, height, blocked, hits, fleet):
+    """count() by listing every layout.
+
+    Ships of the same length are interchangeable, so they're placed in
+    order of their position in placements() and each layout is listed
+    once.
+    """
+    fleet = sorted(fleet)
+    counts = [[0] * width for _ in range(height)]
+    total = 0
+
+    def place(i, taken, start):
+        nonlocal total
+        if i == len(fleet):
+            if hits <= taken:
+                total += 1
+                for x, y in taken:
+                    counts[y][x] += 1
+            return
+        options = placements(width, height, fleet[i])
+        same = i and fleet[i] == fleet[i - 1]
+        for n in range(start if same else 0, len(options)):
+            ship = options[n]
+            if not ship & taken and not ship & blocked:
+                place(i + 1, taken | ship, n + 1)
+
+    place(0, frozenset(), 0)
+    return total, counts
+
+def masks(squares, height):
+    rows = [0] * height
+    for x, y in squares:
+        rows[y] |= 1 << x
+    return rows
+
+def test_counts_match_brute_force():
+    rng = random.Random(41)
+    solvable = 0
+    for _ in range(40):
+        width, height = rng.randint(3, 5), rng.randint(3, 5)
+        fleet = [rng.randint(2, 4) for _ in range(rng.randint(1, 3))]
+        squares = [(x, y) for y in range(height) for x in range(width)]
+        blocked = {s for s in squares if rng.random() < 0.15}
+        hits = {s for s in squares if s not in blocked and rng.random() < 0.1}
+        expected = brute_force(width, height, blocked, hits, fleet)
+        counter = PlacementCounter(width, height)
+        assert counter.count(masks(blocked, height), masks(hits, height),
+                             fleet) == expected, (width, height, fleet, blocked, hits)
+        solvable += expected[0] > 0
+    #the boards aren't all impossible ones
+    assert solvable > 20